@@ -0,0 +1,64 @@
+"""LRU cache of chatbot replies.
+
+Students ask the same handful of questions over and over. Once greetings are
+stripped, a reply depends only on the normalized query text and the knowledge
+base snapshot, so replies are cached under (knowledge base version, normalized
+query). A reload produces a new version, so an entry from an older snapshot
+can never be served.
+
+Entries can also be given a time-to-live, for replies built from live
+database rows (see Chatbot/intents.py).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('CHATBOT_ANSWER_CACHE_MAX_ENTRIES', 2048))
+
+
+class AnswerCache:
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (version, query) -> (expires_at, reply)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, query):
+        key = (version, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, version, query, reply):
+        if self.max_entries <= 0:
+            return
+        key = (version, query)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else None}
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,239 @@
+"""Latency and accuracy benchmark for the chatbot.
+
+Replays a labelled query set built from student_questions.json through the
+same stages chatbot_response uses (bot.prepare_message, bot.suggest_match and
+bot.rank_matches) and reports p50/p95/p99 latency per stage
+plus top-1 accuracy. Each query is a dataset question in one of these forms:
+
+- exact: the question as written
+- typo: one to three character edits
+- greeting: prefixed with a greeting ("hi, ...")
+- paraphrase: reworded with a lead-in or tail phrase, and synonyms swapped for
+  other words from rules.json
+
+A query counts as correct when the stored answer the bot settles on
+("Did you mean" suggestion or TF-IDF best match) is the answer of the question
+it was generated from. Database intents are not exercised (they need an app
+context and live data).
+
+Usage:
+    python -m Chatbot.benchmark                      # run and compare with the stored baseline
+    python -m Chatbot.benchmark --save-baseline      # run and store the result as the new baseline
+    python -m Chatbot.benchmark --backend exact -n 1000 --seed 3
+    python -m Chatbot.benchmark --baseline local.json --save-baseline   # then, on the same machine:
+    python -m Chatbot.benchmark --baseline local.json --fail-on-regression
+
+The exit status is 1 when accuracy drops more than --accuracy-tolerance below
+the baseline. Latency is always reported against the baseline but only fails
+the run with --fail-on-regression (total p95 more than --max-slowdown times
+the baseline), since timings only compare on the machine that recorded them.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from Chatbot import bot
+from Chatbot.knowledge import load_knowledge_base
+from Chatbot.retrieval import RETRIEVAL_BACKEND, build_retriever
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+STAGES = ("normalization", "spelling", "retrieval", "total")
+KINDS = ("exact", "typo", "greeting", "paraphrase")
+
+_GREETINGS = ["hi", "hello", "hey", "good morning", "hi there,", "hello!"]
+_LEAD_INS = ["can you tell me", "i want to know", "please explain", "what about", "info on"]
+_TAILS = ["please", "thanks", "?", "for 2025"]
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _typo(text, rnd):
+    chars = list(text)
+    for _ in range(rnd.randint(1, 3)):
+        if not chars:
+            break
+        i = rnd.randrange(len(chars))
+        op = rnd.random()
+        if op < 0.33:
+            del chars[i]
+        elif op < 0.66:
+            chars.insert(i, rnd.choice(_LETTERS))
+        elif i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def _paraphrase(text, rnd, variants):
+    words = [rnd.choice(variants[w]) if w in variants else w for w in text.lower().split()]
+    if rnd.random() < 0.5:
+        words = rnd.choice(_LEAD_INS).split() + words
+    else:
+        words.append(rnd.choice(_TAILS))
+    return " ".join(words)
+
+
+def build_queries(kb, n, seed=0):
+    """[(kind, query text, expected row)] drawn evenly from the four kinds."""
+    rnd = random.Random(seed)
+    # word -> the words it can be swapped for (a canonical word and its synonyms)
+    variants = {}
+    for synonym, canonical in bot.rules.synonyms.items():
+        group = [canonical] + [s for s, c in bot.rules.synonyms.items() if c == canonical]
+        for word in group:
+            variants[word] = group
+    queries = []
+    for i in range(n):
+        row = rnd.randrange(len(kb))
+        question = kb.questions[row]
+        kind = KINDS[i % len(KINDS)]
+        if kind == "typo":
+            text = _typo(question, rnd)
+        elif kind == "greeting":
+            text = f"{rnd.choice(_GREETINGS)} {question}"
+        elif kind == "paraphrase":
+            text = _paraphrase(question, rnd, variants)
+        else:
+            text = question
+        queries.append((kind, text.lower().strip(), row))
+    return queries
+
+
+def answer_row(kb, message):
+    """Run one message through the chatbot stages; returns (answer row or None, {stage: seconds})."""
+    timings = {}
+    t0 = time.perf_counter()
+    reply, query = bot.prepare_message(message, kb)
+    t1 = time.perf_counter()
+    timings["normalization"] = t1 - t0
+    if reply is not None:
+        timings["total"] = t1 - t0
+        return None, timings
+
+    idx = bot.suggest_match(kb, query)
+    t2 = time.perf_counter()
+    timings["spelling"] = t2 - t1
+    if idx is not None:
+        timings["total"] = t2 - t0
+        return idx, timings
+
+    row = bot.rank_matches(kb, [query])[0]
+    t3 = time.perf_counter()
+    timings["retrieval"] = t3 - t2
+    timings["total"] = t3 - t0
+    return row, timings
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"n": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+    return {"n": len(samples), "p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4),
+            "p99_ms": round(float(p99), 4)}
+
+
+def run(kb, queries, warmup=20):
+    for _, text, _ in queries[:warmup]:
+        answer_row(kb, text)
+
+    samples = {stage: [] for stage in STAGES}
+    correct = {kind: [0, 0] for kind in KINDS}
+    for kind, text, expected in queries:
+        row, timings = answer_row(kb, text)
+        for stage, seconds in timings.items():
+            samples[stage].append(seconds)
+        correct[kind][1] += 1
+        if row is not None and kb.answers[row] == kb.answers[expected]:
+            correct[kind][0] += 1
+
+    hits = sum(c for c, _ in correct.values())
+    return {
+        "queries": len(queries),
+        "accuracy": round(hits / len(queries), 4) if queries else None,
+        "accuracy_by_kind": {k: round(c / t, 4) if t else None for k, (c, t) in correct.items()},
+        "stages": {stage: _percentiles(samples[stage]) for stage in STAGES},
+    }
+
+
+def compare(result, baseline, accuracy_tolerance, max_slowdown, fail_on_slowdown=False):
+    """Print the differences from baseline; returns False when the run regressed.
+
+    Latency only counts as a regression with fail_on_slowdown.
+    """
+    ok = True
+    print(f"\nvs baseline ({baseline.get('config', {})}):")
+    delta = result["accuracy"] - baseline["accuracy"]
+    print(f"  accuracy {baseline['accuracy']:.4f} -> {result['accuracy']:.4f} ({delta:+.4f})")
+    if delta < -accuracy_tolerance:
+        print(f"  FAIL: accuracy dropped by more than {accuracy_tolerance}")
+        ok = False
+    for stage in STAGES:
+        old, new = baseline["stages"].get(stage, {}), result["stages"][stage]
+        if not old.get("p95_ms") or not new["p95_ms"]:
+            continue
+        ratio = new["p95_ms"] / old["p95_ms"]
+        print(f"  {stage:<14} p95 {old['p95_ms']:.3f}ms -> {new['p95_ms']:.3f}ms (x{ratio:.2f})")
+        if stage == "total" and ratio > max_slowdown:
+            if fail_on_slowdown:
+                print(f"  FAIL: total p95 is more than x{max_slowdown} the baseline")
+                ok = False
+            else:
+                print(f"  note: total p95 is more than x{max_slowdown} the baseline "
+                      "(not failing; use --fail-on-regression against a same-machine baseline)")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--queries", type=int, default=800, help="number of labelled queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default=RETRIEVAL_BACKEND, help="retrieval backend to benchmark")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--output", type=Path, help="also write the result JSON here")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.005)
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="also fail when total p95 exceeds the baseline by more than --max-slowdown")
+    args = parser.parse_args(argv)
+
+    kb = load_knowledge_base(bot.normalize_text)
+    if not len(kb):
+        print("Knowledge base is empty; nothing to benchmark.")
+        return 1
+    kb.retriever = build_retriever(kb.tfidf_matrix, args.backend)
+
+    queries = build_queries(kb, args.queries, args.seed)
+    result = run(kb, queries)
+    result["config"] = {"queries": args.queries, "seed": args.seed, "backend": kb.retriever.name,
+                        "corpus": len(kb)}
+
+    print(f"{len(kb)} questions, {result['queries']} queries, backend {kb.retriever.name}")
+    print(f"top-1 accuracy {result['accuracy']:.4f}  " +
+          "  ".join(f"{k} {v:.4f}" for k, v in result["accuracy_by_kind"].items()))
+    print(f"{'stage':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, p in result["stages"].items():
+        if p["n"]:
+            print(f"{stage:<14}{p['n']:>6}{p['p50_ms']:>10.3f}{p['p95_ms']:>10.3f}{p['p99_ms']:>10.3f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+
+    ok = True
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nSaved baseline to {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config", {}).get("seed") != args.seed or \
+                baseline.get("config", {}).get("queries") != args.queries:
+            print("\nNote: baseline was recorded with a different query set; accuracy is not directly comparable.")
+        ok = compare(result, baseline, args.accuracy_tolerance, args.max_slowdown, args.fail_on_regression)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,143 +1,286 @@
-import json # To read the dataset 
-import nltk #Helps the chatbot understand and process human language, It provides tool like tokenizers for text analysis
-import re  #Used for pattern matching and text cleaning
-import string #Used for removing punctuation from text
-from pathlib import Path #Finds exact location of json file
-from difflib import get_close_matches #Checks which question in the dataset closely matches user input
-from sklearn.feature_extraction.text import TfidfVectorizer #Helps the chatbot understand the importance of words in question
-from sklearn.metrics.pairwise import cosine_similarity #This finds which stored question is most similar to the user's input
+import os
+import time
+import threading #Loads the knowledge base in the background so app startup is not blocked
+from Chatbot.rules import RULES_PATH, load_rules #Precompiled synonym, greeting and slang rules
+from Chatbot.knowledge import DATASET_PATH, load_knowledge_base #Dataset, close-match index and TF-IDF snapshot (cached on disk)
+from Chatbot.answer_cache import answer_cache #Caches replies per normalized query and knowledge base version
+from Chatbot.intents import match_intent, intent_cache #Answers deadline/fee questions from the live database
 from flask import url_for #Generates URLs for Flask routes
-# ----------------------------
-# NLTK setup
-# ----------------------------
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('wordnet')
 
-# ----------------------------
-# Load JSON dataset
-# ----------------------------
-base_path = Path(__file__).parent
-file_path = base_path / "student_questions.json"
-
-try:
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-    if isinstance(data, dict) and "data" in data:
-        records = data["data"]
-    else:
-        records = data
-    records = [r for r in records if isinstance(r, dict)]
-    questions = [item["question"] for item in records]
-    answers = [item["answer"] for item in records]
-except Exception as e:
-    print(f"Error loading JSON: {e}")
-    questions, answers = [], []
+# How long a request waits for the knowledge base while it is still loading (seconds)
+READY_TIMEOUT = float(os.getenv("CHATBOT_READY_TIMEOUT", 5))
+# How often the watcher checks the dataset and rules files for changes (seconds, 0 = off)
+WATCH_INTERVAL = float(os.getenv("CHATBOT_WATCH_INTERVAL", 5))
+# Fuzzy-match cutoff for "Did you mean" suggestions
+SUGGESTION_CUTOFF = 0.65
+# Lowest TF-IDF similarity that still counts as an answer
+MIN_SIMILARITY = 0.12
+# Fuzzy-match score above which a message counts as a dataset question as written
+NEAR_EXACT_CUTOFF = 0.9
 
 # ----------------------------
-# Synonyms
+# Synonym / greeting rules (Chatbot/rules.json)
 # ----------------------------
-synonyms = {
-    "fee": ["fees", "cost", "price"],
-    "course": ["courses", "class", "program"],
-    "matric": ["school subjects", "grades", "aps"],
-}
+rules = load_rules()
 
 # ----------------------------
 # Helper functions
 # ----------------------------
 def normalize_text(text: str) -> str:
-    text = text.lower()
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    for key, syn_list in synonyms.items():
-        for syn in syn_list:
-            text = re.sub(r"\b" + re.escape(syn) + r"\b", key, text)
-    return re.sub(r"\s+", " ", text).strip()
-
-def correct_spelling(user_input: str):
-    if not questions:
-        return None, None
-    normalized_questions = [normalize_text(q) for q in questions]
-    normalized_input = normalize_text(user_input)
-    matches = get_close_matches(normalized_input, normalized_questions, n=3, cutoff=0.65)
-    if matches:
-        idx = normalized_questions.index(matches[0])
-        return questions[idx], idx
-    return None, None
+    return rules.normalize(text)
 
 # ----------------------------
-# Precompute TF-IDF
+# Knowledge base loading
 # ----------------------------
-if questions:
-    normalized_questions = [normalize_text(q) for q in questions]
-    vectorizer = TfidfVectorizer(stop_words="english")
-    tfidf_matrix = vectorizer.fit_transform(normalized_questions)
-else:
-    tfidf_matrix = None
-    vectorizer = None
+_kb = None
+_state = "idle"  # idle -> loading -> ready, or failed until a reload succeeds
+_ready = threading.Event()
+_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_reloaded_at = None
+_last_error = None
+_watching = False
+
+def _load():
+    global _kb, _state, _last_error
+    try:
+        _kb = load_knowledge_base(normalize_text)
+        _state = "ready"
+    except Exception as e:
+        # no knowledge base rather than an empty one; /admin/chatbot/reload (or a file edit) retries
+        print(f"Error loading chatbot knowledge base: {e}")
+        _last_error = str(e)
+        _state = "failed"
+    # wake waiting requests either way so they do not sit out READY_TIMEOUT
+    _ready.set()
+
+def start_loading():
+    """Start loading the knowledge base on a background thread (no-op once started)."""
+    global _state
+    with _lock:
+        if _state != "idle":
+            return
+        _state = "loading"
+    threading.Thread(target=_load, name="chatbot-load", daemon=True).start()
+
+def reload_knowledge_base():
+    """Rebuild the knowledge base from disk and swap it in.
+
+    Requests keep answering from the current snapshot until the new one is
+    complete; the swap is a single reference assignment. If the dataset
+    cannot be parsed (e.g. it is mid-write) the current snapshot is kept.
+    Returns False if a reload was already running.
+    """
+    global _kb, _state, rules, _reloaded_at, _last_error
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    try:
+        new_rules = load_rules()
+        # appending rows is only valid if the questions are normalized the same way
+        previous = _kb if new_rules.digest == rules.digest else None
+        try:
+            kb = load_knowledge_base(new_rules.normalize, previous=previous)
+        except Exception as e:
+            _last_error = str(e)
+            print(f"Chatbot reload failed, keeping the current knowledge base: {e}")
+            return True
+        rules = new_rules
+        _kb = kb
+        answer_cache.clear()
+        _state = "ready"
+        _ready.set()
+        _reloaded_at = time.time()
+        _last_error = None
+        return True
+    finally:
+        _reload_lock.release()
+
+def reload_in_background():
+    """Run reload_knowledge_base on a worker thread; False if one is already running."""
+    if _reload_lock.locked():
+        return False
+    threading.Thread(target=reload_knowledge_base, name="chatbot-reload", daemon=True).start()
+    return True
+
+def _file_signature():
+    signature = []
+    for path in (DATASET_PATH, RULES_PATH):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return signature
+
+def _watch(interval):
+    last = _file_signature()
+    while True:
+        time.sleep(interval)
+        current = _file_signature()
+        if current != last:
+            last = current
+            reload_knowledge_base()
+
+def start_watcher(interval=WATCH_INTERVAL):
+    """Poll the dataset and rules files and reload when either changes (no-op once started)."""
+    global _watching
+    if interval <= 0:
+        return
+    with _lock:
+        if _watching:
+            return
+        _watching = True
+    threading.Thread(target=_watch, args=(interval,), name="chatbot-watch", daemon=True).start()
+
+def get_knowledge_base(timeout=READY_TIMEOUT):
+    """Return the loaded knowledge base, waiting up to timeout seconds; None if not ready yet."""
+    start_loading()
+    _ready.wait(timeout)
+    return _kb
+
+def chatbot_status():
+    kb = _kb
+    return {
+        "state": _state,
+        "questions": len(kb) if kb else 0,
+        "version": kb.version[:16] if kb and kb.version else None,
+        "source": kb.source if kb else None,
+        "retrieval": kb.retriever.name if kb and kb.retriever else None,
+        "reloading": _reload_lock.locked(),
+        "reloaded_at": _reloaded_at,
+        "last_error": _last_error,
+        "answer_cache": answer_cache.stats(),
+        "intent_cache": intent_cache.stats()
+    }
 
 # ----------------------------
-# Chatbot response
+# Chatbot stages: prepare_message -> suggest_match -> rank_matches
+# (public so Chatbot/benchmark.py can time them one by one)
 # ----------------------------
-def chatbot_response(user_input: str) -> str:
+def prepare_message(user_input, kb):
+    """Answer messages that need no retrieval.
+
+    Returns (reply, None) when the message is answered here, otherwise
+    (None, query) with the normalized query text to look up.
+    """
     if not user_input or not user_input.strip():
-        return "Please type something so I can assist you 🙂"
+        return "Please type something so I can assist you 🙂", None
     if len(user_input.strip()) < 2:
-        return "That seems too short — can you ask a full question?"
-    if not questions:
-        return "Sorry, my knowledge base is empty right now. Please check the dataset file."
+        return "That seems too short — can you ask a full question?", None
+    if kb is None:
+        if _state == "failed":
+            return "Sorry, my knowledge base could not be loaded right now. Please try again later.", None
+        return "I'm still warming up ⏳ — please ask again in a few seconds.", None
+    if not kb.questions:
+        return "Sorry, my knowledge base is empty right now. Please check the dataset file.", None
 
     normalized_input = user_input.lower().strip()
 
     # --- Greetings ---
-    greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]
-    slang_greetings = ["what's up", "whats up", "sup", "yo", "how's it going", "how are you", "how you doing"]
-    all_greetings = greetings + slang_greetings
-
-    has_greeting = any(re.search(rf"\b{re.escape(g)}\b", normalized_input) for g in all_greetings)
-    clean_input = re.sub(r"[^\w\s]", "", normalized_input)
-    input_words = clean_input.split()
-    greeting_words = []
-    for g in all_greetings:
-        greeting_words.extend(g.split())
-
-    if has_greeting and all(word in greeting_words for word in input_words):
-        if any(s in normalized_input for s in slang_greetings):
-            return "Hey there dudeee 😎 All good here! What can I help you with today?"
-        return "Hello! 👋 I’m ATOM, your student advisor. Ask me about courses, fees, or entry requirements."
+    has_greeting = rules.has_greeting(normalized_input)
+
+    if has_greeting and rules.only_greeting(normalized_input):
+        if rules.is_slang(normalized_input):
+            return "Hey there dudeee 😎 All good here! What can I help you with today?", None
+        return "Hello! 👋 I’m ATOM, your student advisor. Ask me about courses, fees, or entry requirements.", None
 
     # Remove greeting from multi-intent input
     query_text = user_input
     if has_greeting:
-        for g in all_greetings:
-            query_text = re.sub(rf"\b{re.escape(g)}\b", "", query_text, flags=re.IGNORECASE)
-        query_text = query_text.strip(" ,.?;:!-")
+        query_text = rules.strip_greetings(query_text)
+    return None, normalize_text(query_text)
 
+def suggest_match(kb, query):
+    """Row of the stored question a normalized query is a near miss of, or None."""
+    match, idx = kb.close_matches.best_match(query, cutoff=SUGGESTION_CUTOFF)
+    if idx is not None and kb.normalized_questions[idx] != query:
+        return idx
+    return None
+
+def rank_matches(kb, queries):
+    """Best TF-IDF row for each normalized query, None where nothing reaches MIN_SIMILARITY."""
+    best_idx, best_score = kb.best_matches(queries)
+    return [int(idx) if score >= MIN_SIMILARITY else None for idx, score in zip(best_idx, best_score)]
+
+# ----------------------------
+# Chatbot response
+# ----------------------------
+def _retrieve(kb, queries):
+    """Map each normalized query to its reply; failed lookups are returned separately (not cacheable)."""
+    replies, failed = {}, {}
+    to_rank = []
     # --- Spelling suggestion ---
-    suggestion, sugg_idx = correct_spelling(query_text)
-    if sugg_idx is not None and normalize_text(suggestion) != normalize_text(query_text):
-        return f"Did you mean **'{questions[sugg_idx]}'**?\n\n{answers[sugg_idx]}"
+    for query in queries:
+        idx = suggest_match(kb, query)
+        if idx is not None:
+            replies[query] = f"Did you mean **'{kb.questions[idx]}'**?\n\n{kb.answers[idx]}"
+        else:
+            to_rank.append(query)
+    if not to_rank:
+        return replies, failed
 
-    # --- TF-IDF similarity ---
+    # --- TF-IDF similarity (one transform and one sparse product for the whole batch) ---
+    if kb.vectorizer is None or kb.tfidf_matrix is None:
+        failed.update((q, "Sorry, chatbot knowledge base not ready.") for q in to_rank)
+        return replies, failed
     try:
-        if vectorizer is None or tfidf_matrix is None:
-            return "Sorry, chatbot knowledge base not ready."
+        rows = rank_matches(kb, to_rank)
+    except Exception as e:
+        failed.update((q, f"Oops! Something went wrong ({e})") for q in to_rank)
+        return replies, failed
 
-        user_vec = vectorizer.transform([normalize_text(query_text)])
-        similarity_scores = cosine_similarity(user_vec, tfidf_matrix)[0]
-        best_idx = int(similarity_scores.argmax())
-        best_score = float(similarity_scores[best_idx])
+    for query, row in zip(to_rank, rows):
+        if row is None:
+            replies[query] = (
+                "Sorry, I didn’t quite get that 🤔. "
+                f"Try sending us your question on the <a href='{url_for('contact')}'>Contact us page</a>"
+            )
+        else:
+            replies[query] = kb.answers[row]
+    return replies, failed
 
+def _live_answer(query, kb):
+    """Database-backed reply for structured questions (deadlines, fees), or None.
+
+    Questions the dataset holds (exactly or near enough) keep their stored answer.
+    """
+    try:
+        lookup = match_intent(query, rules)
+        if lookup is None:
+            return None
+        if kb.close_matches.best_match(query, cutoff=NEAR_EXACT_CUTOFF)[1] is not None:
+            return None
+        return lookup()
     except Exception as e:
-        return f"Oops! Something went wrong ({e})"
-
-    if best_score < 0.12:
-          return (
-        "Sorry, I didn’t quite get that 🤔. "
-        f"Try sending us your question on the <a href='{url_for('contact')}'>Contact us page</a>"
-    )
-    else:
-        return answers[best_idx]
+        # the dataset answer is still a reasonable fallback
+        print(f"Chatbot intent lookup failed: {e}")
+        return None
+
+def chatbot_responses(messages):
+    """Reply to many messages at once, sharing the cache and a single retrieval pass."""
+    kb = get_knowledge_base()
+    replies = [None] * len(messages)
+    pending = {}  # normalized query -> positions waiting for it
+    for i, message in enumerate(messages):
+        reply, query = prepare_message(message, kb)
+        if reply is None:
+            reply = _live_answer(query, kb)
+        if reply is None:
+            reply = answer_cache.get(kb.version, query)
+        if reply is not None:
+            replies[i] = reply
+        else:
+            pending.setdefault(query, []).append(i)
+
+    if pending:
+        found, failed = _retrieve(kb, list(pending))
+        for query, reply in found.items():
+            answer_cache.put(kb.version, query, reply)
+        found.update(failed)
+        for query, positions in pending.items():
+            for i in positions:
+                replies[i] = found[query]
+    return replies
+
+def chatbot_response(user_input: str) -> str:
+    return chatbot_responses([user_input])[0]
@@ -0,0 +1,74 @@
+"""Close-match lookup over the normalized dataset questions.
+
+difflib.get_close_matches scores the input against every question, so its cost
+grows with student_questions.json. CloseMatchIndex keeps a character-trigram
+inverted index over the distinct normalized questions and only runs
+SequenceMatcher on the few questions that share the most trigrams with the
+input and pass the exact length bound 2*min(a, b)/(a + b) >= cutoff.
+Candidates are scored with the same real_quick_ratio/quick_ratio/ratio cascade
+and tie-breaking as get_close_matches.
+"""
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# How many trigram-ranked questions reach the edit-distance scorer
+MAX_CANDIDATES = 40
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CloseMatchIndex:
+    def __init__(self, normalized_questions):
+        # normalized question -> index of its first occurrence in the dataset
+        self.first_index = {}
+        for i, q in enumerate(normalized_questions):
+            self.first_index.setdefault(q, i)
+        self.texts = list(self.first_index)
+        self.lengths = np.array([len(t) for t in self.texts], dtype=np.int64)
+
+        postings = {}
+        for doc, text in enumerate(self.texts):
+            for gram in trigrams(text):
+                postings.setdefault(gram, []).append(doc)
+        self.postings = {gram: np.array(docs, dtype=np.int64) for gram, docs in postings.items()}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def candidates(self, text, cutoff):
+        """Distinct questions worth scoring, most shared trigrams first."""
+        hits = [self.postings[g] for g in trigrams(text) if g in self.postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.texts))
+        # SequenceMatcher.ratio() can never beat the length bound
+        size = len(text)
+        shared[2 * np.minimum(self.lengths, size) < cutoff * (self.lengths + size)] = 0
+        docs = np.flatnonzero(shared)
+        if len(docs) > MAX_CANDIDATES:
+            docs = docs[np.argpartition(-shared[docs], MAX_CANDIDATES)[:MAX_CANDIDATES]]
+        return [self.texts[d] for d in docs]
+
+    def best_match(self, text, cutoff=0.65):
+        """Return (normalized question, dataset index) of the closest question, or (None, None)."""
+        idx = self.first_index.get(text)
+        if idx is not None:
+            return text, idx
+
+        s = SequenceMatcher()
+        s.set_seq2(text)
+        best = None
+        for candidate in self.candidates(text, cutoff):
+            s.set_seq1(candidate)
+            if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff:
+                score = s.ratio()
+                # get_close_matches ranks by (score, string), highest first
+                if score >= cutoff and (best is None or (score, candidate) > best):
+                    best = (score, candidate)
+        if best is None:
+            return None, None
+        return best[1], self.first_index[best[1]]
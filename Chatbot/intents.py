@@ -0,0 +1,278 @@
+"""Structured questions answered from the live database.
+
+Canned answers in student_questions.json go stale; the Program, Bursary and
+Admission tables do not. A few question shapes are recognised on the
+normalized query text and answered with fixed, indexed queries:
+
+- bursary deadlines: "which bursaries close this month"
+- admission deadlines: "when do applications close at uct"
+- program cost: "what does ukzn bcom cost"
+
+Anything else (or a lookup that finds nothing) returns None so the normal
+dataset retrieval answers instead. The bot also skips these lookups for
+questions the dataset already holds (Chatbot/bot.py _live_answer). Replies,
+including "nothing found", are kept for CHATBOT_INTENT_TTL seconds so repeated
+questions under chat load cost one query per TTL rather than one per message.
+"""
+import calendar
+import os
+import re
+from datetime import date, timedelta
+
+from markupsafe import escape
+from sqlalchemy import bindparam, select
+
+from Database.__init__ import db
+from Database.models import Admission, Bursary, Program, University
+from Chatbot.answer_cache import AnswerCache
+
+INTENT_CACHE_TTL = float(os.getenv('CHATBOT_INTENT_TTL', 60))
+# Most rows listed in one reply
+INTENT_RESULT_LIMIT = 5
+# Window used when a deadline question names no period (days)
+DEFAULT_WINDOW_DAYS = 30
+
+intent_cache = AnswerCache(max_entries=1024, ttl=INTENT_CACHE_TTL)
+
+# Patterns run on normalize_text output: lower-case, no punctuation, synonyms
+# applied (so "fees"/"cost"/"price" all read "fee").
+_BURSARY = re.compile(r"\b(?:bursar(?:y|ies)|scholarships?|funding)\b")
+_CLOSING = re.compile(r"\b(?:clos(?:e|es|ing)|deadlines?|due|ends?|ending)\b")
+_APPLY = re.compile(r"\b(?:appl(?:y|ying|ication|ications)|admissions?)\b")
+_WHEN = re.compile(r"\bwhen\b")
+# Admission deadline lookups only: "when do applications close (at uct)", "closing
+# dates for unisa", "application deadlines (for wits)". Advice that merely mentions
+# a deadline ("what happens if i miss the application deadline") is left to the dataset.
+_WHEN_CLOSING = re.compile(r"^when (?:do|does|will|is|are)\b.*\b(?:clos(?:e|es|ing)|deadlines?|due)\b")
+_CLOSING_DATE = re.compile(r"\bclosing dates?\b")
+_DEADLINE_FOR = re.compile(r"^(?:(?:what (?:is|are)|whats) the )?(?:application|admission)s? "
+                           r"(?:deadlines?|closing dates?)(?: (?:for|at|of) .+)?$")
+_COST = re.compile(r"\b(?:fee|tuition)\b|\bhow much\b")
+_PERIOD = re.compile(r"\b(today|this week|next week|this month|next month|this year)\b")
+
+# Words that carry the question's shape rather than the program being asked about
+_QUESTION_WORDS = {
+    "what", "whats", "does", "do", "is", "are", "the", "a", "an", "for", "at", "of", "in", "to",
+    "how", "much", "fee", "tuition", "course", "study", "studying", "it", "per", "year", "annual",
+    "university", "me", "tell", "about", "and", "my", "i", "can", "will"
+}
+_UNIVERSITY_STOPWORDS = {"university", "of", "the", "technology"}
+# "(UNISA)" in "University of South Africa (UNISA)"
+_ABBREVIATION = re.compile(r"\(([^)]*)\)")
+
+# Precompiled statements; SQLAlchemy caches their compiled SQL
+_BURSARIES_CLOSING = (
+    select(Bursary.title, Bursary.provider, Bursary.amount, Bursary.deadline)
+    .where(Bursary.deadline >= bindparam('start'), Bursary.deadline <= bindparam('end'))
+    .order_by(Bursary.deadline, Bursary.bursary_id)
+    .limit(INTENT_RESULT_LIMIT + 1)
+)
+_ADMISSIONS_OPEN = (
+    select(Admission.title, Admission.institution, Admission.program_name, Admission.application_deadline)
+    .where(Admission.application_deadline >= bindparam('start'))
+    .order_by(Admission.application_deadline, Admission.admission_id)
+    .limit(INTENT_RESULT_LIMIT)
+)
+_ADMISSIONS_OPEN_AT = (
+    select(Admission.title, Admission.institution, Admission.program_name, Admission.application_deadline)
+    .where(Admission.application_deadline >= bindparam('start'),
+           Admission.institution.in_(bindparam('institutions', expanding=True)))
+    .order_by(Admission.application_deadline, Admission.admission_id)
+    .limit(INTENT_RESULT_LIMIT)
+)
+_INSTITUTIONS = select(Admission.institution).distinct()
+_UNIVERSITIES = select(University.university_id, University.name)
+_PROGRAM_FEES = (
+    select(Program.program_name, Program.degree_type, Program.fees)
+    .where(Program.university_id == bindparam('university_id'), Program.fees.isnot(None))
+    .order_by(Program.program_name)
+)
+
+
+def _period(query, today):
+    """(start, end, label) for the period a deadline question asks about."""
+    match = _PERIOD.search(query)
+    label = match.group(1) if match else None
+    if label == "today":
+        return today, today, "today"
+    if label == "this week":
+        return today, today + timedelta(days=6 - today.weekday()), "this week"
+    if label == "next week":
+        start = today + timedelta(days=7 - today.weekday())
+        return start, start + timedelta(days=6), "next week"
+    if label == "this month":
+        return today, today.replace(day=calendar.monthrange(today.year, today.month)[1]), "this month"
+    if label == "next month":
+        first = today.replace(day=calendar.monthrange(today.year, today.month)[1]) + timedelta(days=1)
+        return first, first.replace(day=calendar.monthrange(first.year, first.month)[1]), "next month"
+    if label == "this year":
+        return today, date(today.year, 12, 31), "this year"
+    return today, today + timedelta(days=DEFAULT_WINDOW_DAYS), f"in the next {DEFAULT_WINDOW_DAYS} days"
+
+
+def _cached(key, build):
+    reply = intent_cache.get('intent', key)
+    if reply is None:
+        reply = build() or ""
+        intent_cache.put('intent', key, reply)
+    return reply or None
+
+
+def _match_phrases(name, rules):
+    """Phrases a query may use for an institution: its core name, its abbreviation and rules.json aliases."""
+    norm = rules.normalize(_ABBREVIATION.sub(" ", name))
+    core = " ".join(w for w in norm.split() if w not in _UNIVERSITY_STOPWORDS)
+    phrases = [core] if core else []
+    phrases += [rules.normalize(a) for a in _ABBREVIATION.findall(name) if rules.normalize(a)]
+    for alias, alias_core in rules.university_aliases.items():
+        if alias_core in norm:
+            phrases.append(alias)
+    return phrases
+
+
+def _universities(rules):
+    """[(university_id, name, [match phrases])] from the University table, cached like replies."""
+    rows = intent_cache.get('universities', None)
+    if rows is None:
+        rows = [(university_id, name, _match_phrases(name, rules))
+                for university_id, name in db.session.execute(_UNIVERSITIES)]
+        intent_cache.put('universities', None, rows)
+    return rows
+
+
+def _institutions(rules):
+    """[(institution, [match phrases])] for the free-text Admission.institution values, cached like replies."""
+    rows = intent_cache.get('institutions', None)
+    if rows is None:
+        rows = [(institution, _match_phrases(institution, rules))
+                for institution in db.session.execute(_INSTITUTIONS).scalars() if institution]
+        intent_cache.put('institutions', None, rows)
+    return rows
+
+
+def _find_institutions(query, rules):
+    """Admission.institution values the query names (all sharing the longest matched phrase)."""
+    padded = f" {query} "
+    best, found = "", []
+    for institution, phrases in _institutions(rules):
+        matched = max((p for p in phrases if f" {p} " in padded), key=len, default="")
+        if not matched or len(matched) < len(best):
+            continue
+        if len(matched) > len(best):
+            best, found = matched, []
+        found.append(institution)
+    return found
+
+
+def _names_institution(query, rules):
+    """True when the query names a university we know of (an alias or a University row)."""
+    words = set(query.split())
+    return any(alias in words for alias in rules.university_aliases) or \
+        _find_university(query, rules) is not None
+
+
+def _find_university(query, rules):
+    """(university_id, name, matched phrase) of the university the query names, longest phrase wins."""
+    padded = f" {query} "
+    best = None
+    for university_id, name, phrases in _universities(rules):
+        for phrase in phrases:
+            if f" {phrase} " in padded and (best is None or len(phrase) > len(best[2])):
+                best = (university_id, name, phrase)
+    return best
+
+
+def _bursary_deadlines(query):
+    start, end, label = _period(query, date.today())
+
+    def build():
+        rows = db.session.execute(_BURSARIES_CLOSING, {'start': start, 'end': end}).all()
+        if not rows:
+            return None
+        lines = [f"Bursaries closing {label}:"]
+        for title, provider, amount, deadline in rows[:INTENT_RESULT_LIMIT]:
+            line = f"• {escape(title)} ({escape(provider)}) — closes {deadline.strftime('%d %b %Y')}"
+            if amount:
+                line += f", {escape(amount)}"
+            lines.append(line)
+        if len(rows) > INTENT_RESULT_LIMIT:
+            lines.append("See the Bursaries page for the full list.")
+        return "\n".join(lines)
+
+    return _cached(('bursary_deadlines', start, end), build)
+
+
+def _admission_deadlines(query, rules):
+    institutions = tuple(sorted(_find_institutions(query, rules)))
+    if not institutions and _names_institution(query, rules):
+        # asked about a specific place we hold no admissions for: not everyone's deadlines
+        return None
+    today = date.today()
+
+    def build():
+        if institutions:
+            rows = db.session.execute(_ADMISSIONS_OPEN_AT,
+                                      {'start': today, 'institutions': list(institutions)}).all()
+        else:
+            rows = db.session.execute(_ADMISSIONS_OPEN, {'start': today}).all()
+        if not rows:
+            return None
+        heading = f"Upcoming application deadlines at {escape(institutions[0])}:" if len(institutions) == 1 \
+            else "Upcoming application deadlines:"
+        lines = [heading]
+        for title, institution, program_name, deadline in rows[:INTENT_RESULT_LIMIT]:
+            what = escape(program_name or title)
+            lines.append(f"• {escape(institution)} — {what}: apply by {deadline.strftime('%d %b %Y')}")
+        return "\n".join(lines)
+
+    return _cached(('admission_deadlines', institutions, today), build)
+
+
+def _program_cost(query, rules):
+    university = _find_university(query, rules)
+    if university is None:
+        return None
+    university_words = set(university[2].split())
+    terms = [w for w in query.split() if w not in _QUESTION_WORDS and w not in university_words]
+    if not terms:
+        return None
+
+    def build():
+        matches = []
+        for program_name, degree_type, fees in db.session.execute(
+                _PROGRAM_FEES, {'university_id': university[0]}):
+            haystack = rules.normalize(f"{program_name} {degree_type or ''}")
+            if all(term in haystack for term in terms):
+                matches.append((program_name, fees))
+        if not matches:
+            return None
+        lines = [f"Tuition fees at {escape(university[1])}:"]
+        lines += [f"• {escape(name)}: {escape(fees)}" for name, fees in matches[:INTENT_RESULT_LIMIT]]
+        if len(matches) > INTENT_RESULT_LIMIT:
+            lines.append("Ask about a specific programme to narrow this down.")
+        return "\n".join(lines)
+
+    return _cached(('program_cost', university[0], tuple(terms)), build)
+
+
+def _is_admission_deadline(query):
+    if _WHEN_CLOSING.search(query):
+        return _APPLY.search(query) is not None
+    return _CLOSING_DATE.search(query) is not None or _DEADLINE_FOR.search(query) is not None
+
+
+def match_intent(query, rules):
+    """Zero-argument lookup for a recognised structured question, or None. Runs no queries itself."""
+    if _BURSARY.search(query) and (_CLOSING.search(query) or _WHEN.search(query)):
+        return lambda: _bursary_deadlines(query)
+    if _is_admission_deadline(query):
+        return lambda: _admission_deadlines(query, rules)
+    if _COST.search(query):
+        return lambda: _program_cost(query, rules)
+    return None
+
+
+def answer_intent(query, rules):
+    """Reply from the database for a recognised structured question, or None."""
+    lookup = match_intent(query, rules)
+    return lookup() if lookup else None
@@ -0,0 +1,221 @@
+"""Immutable snapshot of the chatbot knowledge base.
+
+A KnowledgeBase bundles everything a reply needs: the dataset questions and
+answers, their normalized forms, the close-match index and the fitted TF-IDF
+vectorizer and matrix. Fitting is the slow part of startup, so the fitted
+state is saved under CHATBOT_CACHE_DIR in a directory named after a hash of
+the dataset, the normalization rules and the artifact format. A cold start
+with an unchanged dataset memory-maps the matrix from there instead of
+refitting. Changing student_questions.json or rules.json changes the hash, so
+a stale artifact is never used.
+
+When rows are only appended to the dataset (the usual way FAQs get added), a
+reload vectorizes just the new rows with the existing vocabulary and IDF
+weights instead of refitting. Once the rows added since the last fit exceed
+CHATBOT_REFIT_RATIO of the fitted corpus, the next reload refits from scratch.
+Artifacts on disk always hold a full fit.
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from Chatbot.fuzzy import CloseMatchIndex
+from Chatbot.retrieval import build_retriever
+from Chatbot.rules import RULES_PATH
+
+DATASET_PATH = Path(__file__).parent / "student_questions.json"
+CACHE_DIR = Path(os.getenv("CHATBOT_CACHE_DIR", Path(__file__).parent / ".cache"))
+
+# Bump when the artifact layout or the fitting parameters change
+ARTIFACT_VERSION = 1
+# Share of appended (not yet fitted) rows above which a reload refits
+REFIT_RATIO = float(os.getenv("CHATBOT_REFIT_RATIO", 0.1))
+
+
+def read_records(raw):
+    """Parse the dataset bytes into (questions, answers)."""
+    data = json.loads(raw)
+    if isinstance(data, dict) and "data" in data:
+        records = data["data"]
+    else:
+        records = data
+    records = [r for r in records if isinstance(r, dict)]
+    return [item["question"] for item in records], [item["answer"] for item in records]
+
+
+def dataset_hash(raw, rules_raw=b""):
+    import sklearn
+    h = hashlib.sha256()
+    h.update(f"kb-v{ARTIFACT_VERSION}-sklearn-{sklearn.__version__}\0".encode())
+    h.update(rules_raw)
+    h.update(b"\0")
+    h.update(raw)
+    return h.hexdigest()
+
+
+class KnowledgeBase:
+    def __init__(self, questions, answers, normalized_questions, vectorizer, tfidf_matrix, version):
+        self.questions = questions
+        self.answers = answers
+        self.normalized_questions = normalized_questions
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.version = version
+        self.close_matches = CloseMatchIndex(normalized_questions)
+        self.retriever = build_retriever(tfidf_matrix)
+        self.fitted_rows = len(questions)  # rows the vectorizer was fit on
+        self.source = "fit"                # fit | artifact | append
+
+    def __len__(self):
+        return len(self.questions)
+
+    @classmethod
+    def build(cls, questions, answers, normalize, version):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        normalized_questions = [normalize(q) for q in questions]
+        vectorizer, tfidf_matrix = None, None
+        if questions:
+            vectorizer = TfidfVectorizer(stop_words="english")
+            tfidf_matrix = vectorizer.fit_transform(normalized_questions)
+        return cls(questions, answers, normalized_questions, vectorizer, tfidf_matrix, version)
+
+    def can_extend(self, questions, answers, max_growth=REFIT_RATIO):
+        """True if questions/answers only append rows to this snapshot, and few enough to skip a refit."""
+        n = len(self)
+        return (self.vectorizer is not None
+                and len(questions) > n
+                and questions[:n] == self.questions
+                and answers[:n] == self.answers
+                and len(questions) - self.fitted_rows <= max_growth * self.fitted_rows)
+
+    def extend(self, questions, answers, normalize, version):
+        """Return a new snapshot with the appended rows vectorized against this vocabulary."""
+        from scipy.sparse import vstack
+
+        added = [normalize(q) for q in questions[len(self):]]
+        matrix = vstack([self.tfidf_matrix, self.vectorizer.transform(added)], format="csr")
+        kb = KnowledgeBase(questions, answers, self.normalized_questions + added,
+                           self.vectorizer, matrix, version)
+        kb.fitted_rows = self.fitted_rows
+        kb.source = "append"
+        return kb
+
+    def search(self, normalized_queries, k=1):
+        """Top-k (rows, cosine scores) per query from the configured retrieval backend.
+
+        All queries are vectorized in one transform; rows sharing no term with
+        a query are left out.
+        """
+        return self.retriever.search(self.vectorizer.transform(normalized_queries), k)
+
+    def best_matches(self, normalized_queries):
+        """Return (row, cosine score) arrays of the closest stored question for each query.
+
+        A query matching nothing gets row 0 with score 0, like argmax over an all-zero row.
+        """
+        best_idx = np.zeros(len(normalized_queries), dtype=np.int64)
+        best_score = np.zeros(len(normalized_queries), dtype=np.float64)
+        for i, (rows, scores) in enumerate(self.search(normalized_queries, k=1)):
+            if len(rows):
+                best_idx[i], best_score[i] = rows[0], scores[0]
+        return best_idx, best_score
+
+    def save(self, directory):
+        """Write the snapshot to directory atomically (build aside, then rename)."""
+        directory = Path(directory)
+        tmp = directory.with_name(f"{directory.name}.tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        with open(tmp / "corpus.json", "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "questions": self.questions, "answers": self.answers,
+                       "normalized_questions": self.normalized_questions}, f)
+        with open(tmp / "vectorizer.pkl", "wb") as f:
+            pickle.dump(self.vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.tfidf_matrix is not None:
+            matrix = self.tfidf_matrix.tocsr()
+            np.save(tmp / "tfidf_data.npy", matrix.data)
+            np.save(tmp / "tfidf_indices.npy", matrix.indices)
+            np.save(tmp / "tfidf_indptr.npy", matrix.indptr)
+            with open(tmp / "tfidf_shape.json", "w") as f:
+                json.dump(list(matrix.shape), f)
+
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # another worker saved the same snapshot first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory):
+        directory = Path(directory)
+        with open(directory / "corpus.json", "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+        with open(directory / "vectorizer.pkl", "rb") as f:
+            vectorizer = pickle.load(f)
+        tfidf_matrix = None
+        if (directory / "tfidf_shape.json").exists():
+            with open(directory / "tfidf_shape.json") as f:
+                shape = tuple(json.load(f))
+            tfidf_matrix = csr_matrix((np.load(directory / "tfidf_data.npy", mmap_mode="r"),
+                                       np.load(directory / "tfidf_indices.npy", mmap_mode="r"),
+                                       np.load(directory / "tfidf_indptr.npy", mmap_mode="r")),
+                                      shape=shape)
+        kb = cls(corpus["questions"], corpus["answers"], corpus["normalized_questions"],
+                 vectorizer, tfidf_matrix, corpus["version"])
+        kb.source = "artifact"
+        return kb
+
+
+def artifact_dir(version, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f"kb-{version[:16]}"
+
+
+def load_knowledge_base(normalize, path=DATASET_PATH, cache_dir=CACHE_DIR, previous=None):
+    """Return the KnowledgeBase for the dataset at path.
+
+    Uses the on-disk artifact when one matches, else extends previous when the
+    dataset only gained a few rows, else fits from scratch and saves the
+    result. Raises if the dataset cannot be read or parsed.
+    """
+    raw = Path(path).read_bytes()
+    questions, answers = read_records(raw)
+
+    try:
+        rules_raw = RULES_PATH.read_bytes()
+    except OSError:
+        rules_raw = b""
+    version = dataset_hash(raw, rules_raw)
+    if previous is not None and previous.version == version:
+        return previous
+    directory = artifact_dir(version, cache_dir)
+
+    if directory.exists():
+        try:
+            kb = KnowledgeBase.load(directory)
+            if kb.version == version:
+                return kb
+        except Exception as e:
+            print(f"Ignoring unreadable chatbot artifact {directory}: {e}")
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if previous is not None and previous.can_extend(questions, answers):
+        return previous.extend(questions, answers, normalize, version)
+
+    kb = KnowledgeBase.build(questions, answers, normalize, version)
+    try:
+        kb.save(directory)
+        # older snapshots are unreachable once the dataset changed
+        for old in Path(cache_dir).glob("kb-*"):
+            if old.is_dir() and old != directory and ".tmp" not in old.name:
+                shutil.rmtree(old, ignore_errors=True)
+    except OSError as e:
+        print(f"Could not save chatbot artifact: {e}")
+    return kb
@@ -0,0 +1,136 @@
+"""Retrieval backends for the chatbot's TF-IDF matrix.
+
+Every backend answers search(query_vecs, k) with one (rows, scores) pair per
+query, best first, ties broken by the earlier row. Only rows that share a term
+with the query are returned, so a query with no known terms gets an empty
+result. Pick a backend with CHATBOT_RETRIEVAL:
+
+- "exact": dense cosine against every stored question. Linear in corpus size;
+  kept as the reference implementation.
+- "inverted" (default): the matrix is stored term-major, so a query only walks
+  the posting lists of its own terms. TF-IDF rows and queries are already
+  L2-normalized, so the accumulated dot product is the cosine score.
+- "ann": TruncatedSVD embeddings in an HNSW graph (needs hnswlib). Candidates
+  from the graph are re-scored against the sparse rows, so the returned scores
+  are exact cosines and the 0.12 threshold still means the same thing. Falls
+  back to "inverted" when hnswlib is not installed.
+"""
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+RETRIEVAL_BACKEND = os.getenv("CHATBOT_RETRIEVAL", "inverted").lower()
+# ANN settings: embedding size, HNSW search breadth and candidates fetched per requested result
+ANN_DIMS = int(os.getenv("CHATBOT_ANN_DIMS", 256))
+ANN_EF = int(os.getenv("CHATBOT_ANN_EF", 64))
+ANN_OVERFETCH = int(os.getenv("CHATBOT_ANN_OVERFETCH", 50))
+
+_EMPTY = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+
+def top_k(rows, scores, k):
+    """The k best (rows, scores), highest score first and the earlier row on ties."""
+    if len(rows) > k:
+        # keep everything tied with the k-th score so ties resolve by row below
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = scores >= threshold
+        rows, scores = rows[keep], scores[keep]
+    order = np.lexsort((rows, -scores))[:k]
+    return rows[order].astype(np.int64), scores[order]
+
+
+class ExactRetriever:
+    name = "exact"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def search(self, query_vecs, k=1):
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        results = []
+        for scores in cosine_similarity(query_vecs, self.matrix):
+            rows = np.flatnonzero(scores > 0)
+            results.append(top_k(rows, scores[rows], k) if len(rows) else _EMPTY)
+        return results
+
+
+class InvertedIndexRetriever:
+    name = "inverted"
+
+    def __init__(self, matrix):
+        # term x question: row t is the posting list of term t
+        self.postings = csr_matrix(matrix).T.tocsr()
+        self.postings.sort_indices()
+
+    def search(self, query_vecs, k=1):
+        # sparse x sparse product only visits the posting lists of each query's terms
+        scores = csr_matrix(query_vecs) @ self.postings
+        results = []
+        for i in range(scores.shape[0]):
+            lo, hi = scores.indptr[i], scores.indptr[i + 1]
+            if lo == hi:
+                results.append(_EMPTY)
+                continue
+            results.append(top_k(scores.indices[lo:hi], scores.data[lo:hi], k))
+        return results
+
+
+class AnnRetriever:
+    name = "ann"
+
+    def __init__(self, matrix, dims=ANN_DIMS, ef=ANN_EF):
+        import hnswlib
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.preprocessing import normalize
+
+        self._normalize = normalize
+        self.matrix = csr_matrix(matrix)
+        n_rows, n_terms = self.matrix.shape
+        self.svd = TruncatedSVD(n_components=max(1, min(dims, n_terms - 1, n_rows - 1)), random_state=0)
+        embeddings = normalize(self.svd.fit_transform(self.matrix))
+        self.index = hnswlib.Index(space="cosine", dim=embeddings.shape[1])
+        self.index.init_index(max_elements=n_rows, ef_construction=200, M=16)
+        self.index.add_items(embeddings, np.arange(n_rows))
+        self.index.set_ef(max(ef, 1))
+
+    def search(self, query_vecs, k=1):
+        query_vecs = csr_matrix(query_vecs)
+        n_rows = self.matrix.shape[0]
+        fetch = min(n_rows, max(k * ANN_OVERFETCH, k))
+        self.index.set_ef(max(self.index.ef, fetch))
+        embeddings = self._normalize(self.svd.transform(query_vecs))
+        labels, _ = self.index.knn_query(embeddings, k=fetch)
+
+        results = []
+        for i in range(query_vecs.shape[0]):
+            if query_vecs.indptr[i] == query_vecs.indptr[i + 1]:
+                results.append(_EMPTY)
+                continue
+            candidates = np.unique(labels[i]).astype(np.int64)
+            # re-score against the sparse rows so scores are exact cosines
+            scores = (self.matrix[candidates] @ query_vecs[i].T).toarray().ravel()
+            keep = scores > 0
+            results.append(top_k(candidates[keep], scores[keep], k) if keep.any() else _EMPTY)
+        return results
+
+
+BACKENDS = {
+    "exact": ExactRetriever,
+    "inverted": InvertedIndexRetriever,
+    "ann": AnnRetriever,
+}
+
+
+def build_retriever(matrix, backend=RETRIEVAL_BACKEND):
+    if matrix is None:
+        return None
+    if backend not in BACKENDS:
+        print(f"Unknown CHATBOT_RETRIEVAL '{backend}', using the inverted index")
+        backend = "inverted"
+    try:
+        return BACKENDS[backend](matrix)
+    except ImportError as e:
+        print(f"Retrieval backend '{backend}' unavailable ({e}), using the inverted index")
+        return InvertedIndexRetriever(matrix)
@@ -0,0 +1,81 @@
+"""Synonym, greeting and slang rules for the chatbot, compiled once.
+
+The tables live in rules.json so they can grow without code changes. Each
+table is compiled into a single alternation regex (longest phrase first), and
+synonyms map back to their canonical word through a dict, so the per-message
+cost stays a few regex passes however many rules there are.
+"""
+import hashlib
+import json
+import re
+import string
+from pathlib import Path
+
+RULES_PATH = Path(__file__).parent / "rules.json"
+
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def _alternation(phrases, word_boundary=True):
+    # longest first so "school subjects" wins over any shorter overlapping phrase
+    body = "|".join(re.escape(p) for p in sorted(set(phrases), key=len, reverse=True))
+    if word_boundary:
+        body = rf"\b(?:{body})\b"
+    return re.compile(body or r"(?!)", re.IGNORECASE)
+
+
+class Rules:
+    def __init__(self, synonyms=None, greetings=(), slang_greetings=(), university_aliases=None):
+        self.synonyms = {}  # synonym -> canonical word
+        for key, syn_list in (synonyms or {}).items():
+            for syn in syn_list:
+                self.synonyms.setdefault(syn.lower(), key)
+        self.greetings = list(greetings)
+        self.slang_greetings = list(slang_greetings)
+        all_greetings = self.greetings + self.slang_greetings
+        self.greeting_words = {word for g in all_greetings for word in g.lower().split()}
+        # abbreviation -> part of the normalized university name ("uct" -> "cape town")
+        self.university_aliases = {k.lower(): v for k, v in (university_aliases or {}).items()}
+
+        self._synonym_re = _alternation(self.synonyms)
+        self._greeting_re = _alternation(all_greetings)
+        self._slang_re = _alternation(self.slang_greetings, word_boundary=False)
+        self.digest = None  # hash of the rules file this was loaded from
+
+    @classmethod
+    def load(cls, path=RULES_PATH):
+        with open(path, "rb") as file:
+            raw = file.read()
+        data = json.loads(raw)
+        rules = cls(data.get("synonyms"), data.get("greetings", ()), data.get("slang_greetings", ()),
+                    data.get("university_aliases"))
+        rules.digest = hashlib.sha1(raw).hexdigest()
+        return rules
+
+    def normalize(self, text):
+        """Lower-case, strip punctuation, map synonyms to their canonical word, collapse spaces."""
+        text = text.lower().translate(_PUNCTUATION)
+        text = self._synonym_re.sub(lambda m: self.synonyms[m.group(0).lower()], text)
+        return " ".join(text.split())
+
+    def has_greeting(self, text):
+        return self._greeting_re.search(text) is not None
+
+    def is_slang(self, text):
+        return self._slang_re.search(text) is not None
+
+    def only_greeting(self, text):
+        """True when every word of text belongs to some greeting."""
+        words = re.sub(r"[^\w\s]", "", text).split()
+        return all(word in self.greeting_words for word in words)
+
+    def strip_greetings(self, text):
+        return self._greeting_re.sub("", text).strip(" ,.?;:!-")
+
+
+def load_rules(path=RULES_PATH):
+    try:
+        return Rules.load(path)
+    except Exception as e:
+        print(f"Error loading chatbot rules: {e}")
+        return Rules()
@@ -0,0 +1,102 @@
+"""Server-Sent Events plumbing for /ask/stream.
+
+The reply is computed on a small worker pool while the response generator
+sends a heartbeat comment every CHATBOT_STREAM_HEARTBEAT seconds, so proxies
+keep the connection open during a slow lookup. Once the reply is ready it is
+sent in chunks. Each stream announces an id in its "start" event; cancelling
+that id (or simply disconnecting) stops the stream at the next chunk or
+heartbeat.
+
+Events, in order: start {"id"}, chunk {"text"}..., then done {} or
+cancelled {} or error {"error"}.
+
+This is about latency and keeping slow connections alive, not capacity: the
+generator still holds its WSGI worker thread for the whole stream while it
+polls the pool, so each open stream costs a request slot plus a pool worker.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+HEARTBEAT_INTERVAL = float(os.getenv('CHATBOT_STREAM_HEARTBEAT', 10))
+STREAM_WORKERS = int(os.getenv('CHATBOT_STREAM_WORKERS', 4))
+# Approximate characters per chunk event
+CHUNK_CHARS = 120
+# How often a waiting stream checks for cancellation (seconds)
+_POLL = 0.25
+
+_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix='chatbot-stream')
+_lock = threading.Lock()
+_streams = {}  # stream id -> threading.Event set on cancel
+
+# Tags stay whole so a partial chunk never ends inside "<a href=...>"
+_TOKENS = re.compile(r"<[^>]*>|\s+|[^\s<]+")
+
+
+def sse(data, event=None):
+    lines = f"event: {event}\n" if event else ""
+    return f"{lines}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def chunk_reply(text, size=CHUNK_CHARS):
+    """Split text into chunks of about size characters on whitespace/tag boundaries."""
+    chunk = ""
+    for token in _TOKENS.findall(text):
+        if chunk and len(chunk) + len(token) > size and not token.isspace():
+            yield chunk
+            chunk = ""
+        chunk += token
+    if chunk:
+        yield chunk
+
+
+def cancel_stream(stream_id):
+    """Ask a running stream to stop; False if no such stream is open."""
+    with _lock:
+        cancelled = _streams.get(stream_id)
+    if cancelled is None:
+        return False
+    cancelled.set()
+    return True
+
+
+def stream_reply(compute):
+    """Generator of SSE text for the reply returned by compute() (run on the worker pool)."""
+    stream_id = uuid.uuid4().hex
+    cancelled = threading.Event()
+    with _lock:
+        _streams[stream_id] = cancelled
+    future = _executor.submit(compute)
+    try:
+        yield sse({'id': stream_id}, 'start')
+
+        last_beat = time.monotonic()
+        while not future.done():
+            if cancelled.is_set():
+                future.cancel()
+                yield sse({}, 'cancelled')
+                return
+            wait([future], timeout=_POLL)
+            if not future.done() and time.monotonic() - last_beat >= HEARTBEAT_INTERVAL:
+                last_beat = time.monotonic()
+                yield ": heartbeat\n\n"
+
+        try:
+            reply = future.result()
+        except Exception as e:
+            yield sse({'error': f"Something unexpected happened ({e}). Please try again."}, 'error')
+            return
+
+        for chunk in chunk_reply(reply):
+            if cancelled.is_set():
+                yield sse({}, 'cancelled')
+                return
+            yield sse({'text': chunk}, 'chunk')
+        yield sse({}, 'done')
+    finally:
+        with _lock:
+            _streams.pop(stream_id, None)
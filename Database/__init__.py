@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
+import sqlalchemy as sa
 import os
 from os import path
 from Database.backup import backup_database, restore_latest_backup
@@ -12,7 +13,7 @@ migrate = Migrate()
 
 # Configuration constants
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "database.db")
+DB_PATH = os.getenv('DATABASE_PATH', os.path.join(BASE_DIR, "database.db"))
 BACKUP_DIR = os.path.join(BASE_DIR, "backups")
 
 
@@ -34,6 +35,53 @@ def create_database(app):
     with app.app_context():
         db.create_all()
         print("📦 Verified all tables exist.")
+        upgrade_schema()
+
+
+def upgrade_schema():
+    """Apply column and index changes to existing tables, which db.create_all() never does.
+
+    database.db is not managed by Alembic (it has no alembic_version table), so
+    changes that only live in migrations/ never reach it. Each step checks the
+    live schema first and does nothing once applied. Needs an app context.
+    """
+    inspector = sa.inspect(db.engine)
+    tables = inspector.get_table_names()
+    if 'ws_program' in tables and \
+            'normalized_name' not in {c['name'] for c in inspector.get_columns('ws_program')}:
+        _add_ws_program_normalized_name()
+    # Chatbot deadline lookups filter and sort on these (models declare index=True)
+    with db.engine.begin() as conn:
+        if 'bursary' in tables:
+            conn.execute(sa.text("CREATE INDEX IF NOT EXISTS ix_bursary_deadline ON bursary (deadline)"))
+        if 'admission' in tables:
+            conn.execute(sa.text("CREATE INDEX IF NOT EXISTS ix_admission_application_deadline "
+                                 "ON admission (application_deadline)"))
+
+
+def _add_ws_program_normalized_name():
+    """Upsert key for scraped programs (see routes/web_scrapping.py save_programs_to_db)."""
+    from routes.web_scrapping import normalize_program_name
+
+    with db.engine.begin() as conn:
+        conn.execute(sa.text("ALTER TABLE ws_program ADD COLUMN normalized_name VARCHAR(150) NOT NULL DEFAULT ''"))
+        # Backfill the key and drop duplicates left by repeated imports, keeping the newest row
+        rows = conn.execute(sa.text("SELECT id, university_id, program_name FROM ws_program ORDER BY id DESC")).all()
+        seen = set()
+        updates, duplicates = [], []
+        for row_id, university_id, program_name in rows:
+            key = (university_id, normalize_program_name(program_name))
+            if key in seen:
+                duplicates.append({'id': row_id})
+            else:
+                seen.add(key)
+                updates.append({'id': row_id, 'normalized_name': key[1]})
+        if duplicates:
+            conn.execute(sa.text("DELETE FROM ws_program WHERE id = :id"), duplicates)
+        if updates:
+            conn.execute(sa.text("UPDATE ws_program SET normalized_name = :normalized_name WHERE id = :id"), updates)
+        conn.execute(sa.text("CREATE UNIQUE INDEX _ws_program_name_uc ON ws_program (university_id, normalized_name)"))
+    print(f"🔧 Added ws_program.normalized_name ({len(updates)} rows keyed, {len(duplicates)} duplicates removed).")
 
 
 def register_models():
@@ -51,7 +99,8 @@ def register_models():
         Bursary,
         LikedCourse,
         WSUniversity,
-        WSProgram
+        WSProgram,
+        WSImport
     )
     print("📋 All models registered.")
 
@@ -78,8 +127,12 @@ def register_blueprints(app):
     print("🔗 All blueprints registered.")
 
 
-def create_app():
-    """Initialize and configure the Flask application."""
+def create_app(init_database=True):
+    """Initialize and configure the Flask application.
+
+    init_database=False leaves the database file alone (see initialize_database),
+    so the app can be built in processes that must not touch it.
+    """
     # Create Flask app instance
     app = Flask(
         __name__,
@@ -103,12 +156,15 @@ def create_app():
     # Register all blueprints
     register_blueprints(app)
     
-    # Initialize database
-    create_database(app)
-    
-    # Create backup
-    backup_database(DB_PATH, BACKUP_DIR)
+    if init_database:
+        initialize_database(app)
     
     print("🚀 Application initialized successfully!")
     
-    return app
\ No newline at end of file
+    return app
+
+
+def initialize_database(app):
+    """Create missing tables and back up the database."""
+    create_database(app)
+    backup_database(DB_PATH, BACKUP_DIR)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Query-count check for the course management page.
+
+Builds the full app on a throwaway SQLite database, seeds it with courses
+(each with a few requirements) and, through the test client, loads what the
+page loads: GET /courses/manage (a shell that queries nothing) and the first
+two keyset pages of /courses/all that static/js/course_management.js fetches.
+Each request must stay at a fixed number of queries however many courses
+exist, hence the large default run.
+
+Usage:
+    python -m Database.check_queries                # 10 and 2000 courses
+    python -m Database.check_queries --courses 50 5000
+
+The exit status is 1 when any request goes over --max-queries (default 3).
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+MANAGE_URL = '/courses/manage'
+PAGE_URL = '/courses/all?limit=50'
+
+
+def seed(db, models, n_courses, n_universities=10):
+    """Top the database up to n_courses courses spread over n_universities universities."""
+    universities = models.University.query.all()
+    if not universities:
+        universities = [models.University(name=f'Check University {i}', city='City', province_state='Gauteng')
+                        for i in range(n_universities)]
+        db.session.add_all(universities)
+        db.session.flush()
+    existing = models.Program.query.count()
+    programs = [models.Program(university_id=universities[i % len(universities)].university_id,
+                               program_name=f'Check Program {i}', degree_type='Bachelor',
+                               duration_years=3, description='Seeded by check_queries',
+                               fees='R45000', location='Main Campus', study_mode='contact')
+                for i in range(existing, n_courses)]
+    db.session.add_all(programs)
+    db.session.flush()
+    db.session.add_all(models.Requirement(program_id=program.program_id, required_subject=subject,
+                                          min_grade_percentage=50)
+                       for program in programs for subject in ('Mathematics', 'English'))
+    db.session.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the SQL query count of the course management page.')
+    parser.add_argument('--courses', type=int, nargs='+', default=[10, 2000],
+                        help='course counts to render the page with')
+    parser.add_argument('--max-queries', type=int, default=3)
+    parser.add_argument('--verbose', action='store_true', help='print the statements issued')
+    args = parser.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        # must be set before app.py builds the app, which reads the path once
+        db_path = os.path.join(tmp, 'check_queries.db')
+        os.environ['DATABASE_PATH'] = db_path
+        from app import app
+        from Database.__init__ import db
+        from Database import models
+        from Database.query_counter import count_queries
+
+        app.testing = True
+        client = app.test_client()
+        with app.app_context():
+            if db.engine.url.database != db_path:
+                # Database.__init__ was imported before DATABASE_PATH was set
+                print(f"Refusing to seed {db.engine.url.database}; run this as python -m Database.check_queries")
+                return 2
+            db.create_all()
+        for n_courses in sorted(args.courses):
+            with app.app_context():
+                seed(db, models, n_courses)
+            urls = [MANAGE_URL, PAGE_URL]
+            while urls:
+                url = urls.pop(0)
+                with app.app_context(), count_queries() as counter:
+                    response = client.get(url)
+                if url == PAGE_URL and response.status_code == 200 and response.get_json()['next_cursor']:
+                    urls.append(f"{PAGE_URL}&cursor={response.get_json()['next_cursor']}")
+                ok = response.status_code == 200 and counter.count <= args.max_queries
+                failed = failed or not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {n_courses:>6} courses: GET {url}: HTTP {response.status_code}, "
+                      f"{counter.count} queries (max {args.max_queries})")
+                if args.verbose or not ok:
+                    for statement in counter.statements:
+                        print('       ' + ' '.join(statement.split()))
+        with app.app_context():
+            db.engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
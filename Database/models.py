@@ -85,7 +85,7 @@ class Bursary(db.Model):
     provider = db.Column(db.String(200), nullable=False)
     provider_type = db.Column(db.String(50))  # government, corporate, ngo, university
     amount = db.Column(db.String(100))
-    deadline = db.Column(db.Date)
+    deadline = db.Column(db.Date, index=True)
     field_of_study = db.Column(db.String(100))
     study_level = db.Column(db.String(50))
     description = db.Column(db.Text)
@@ -140,7 +140,7 @@ class Admission(db.Model):
     institution = db.Column(db.String(200), nullable=False)
     institution_type = db.Column(db.String(50))  # university, college, tvet, private
     program_name = db.Column(db.String(200))
-    application_deadline = db.Column(db.Date)
+    application_deadline = db.Column(db.Date, index=True)
     registration_deadline = db.Column(db.Date)
     academic_year = db.Column(db.String(20))  # e.g., "2025", "2025/2026"
     intake_period = db.Column(db.String(50))  # first_semester, second_semester, quarterly
@@ -213,7 +213,25 @@ class WSProgram(db.Model):
     study_mode = db.Column(db.String(50))
     fees = db.Column(db.String(50))
 
+    # Upsert key for re-imports: lower-case program name with punctuation and spacing collapsed
+    normalized_name = db.Column(db.String(150), nullable=False)
+
     university_id = db.Column(db.Integer, db.ForeignKey('ws_university.id'), nullable=False)
+    __table_args__ = (db.UniqueConstraint('university_id', 'normalized_name', name='_ws_program_name_uc'),)
+
+    def __repr__(self):
+        return f"<WSProgram {self.program_name} at University ID {self.university_id}>"
+
+class WSImport(db.Model):
+    """A prospectus PDF that has been imported, keyed by the SHA-256 of its bytes."""
+    __tablename__ = 'ws_import'
+    id = db.Column(db.Integer, primary_key=True)
+    university_id = db.Column(db.Integer, db.ForeignKey('ws_university.id'), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    filename = db.Column(db.String(255))
+    programs = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('university_id', 'content_hash', name='_ws_import_hash_uc'),)
 
     def __repr__(self):
-        return f"<WSProgram {self.program_name} at University ID {self.university_id}>"
\ No newline at end of file
+        return f"<WSImport {self.filename} ({self.content_hash[:12]})>"
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Count the SQL statements a block of code issues; used by Database/check_queries.py."""
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from Database.__init__ import db
+
+
+class QueryCounter:
+    """Counts SQL statements issued by the current thread while active."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self._thread = threading.get_ident()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # other requests share the engine; only count our own thread's queries
+        if threading.get_ident() == self._thread:
+            self.count += 1
+            self.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Usage:
+        with count_queries() as counter:
+            ...
+        print(counter.count)
+    """
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._on_execute)
+
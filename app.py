@@ -1,12 +1,15 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file, Response, stream_with_context, copy_current_request_context
 from routes.auth import auth
 from routes.search import search
 from routes.courses import courses
 from routes.bursary import bursary
 from Database.backup import backup_database
-from Database.__init__ import db, create_database, create_app
+from Database.__init__ import db, create_database, create_app, initialize_database
 from Database.models import Student, Preference, AcademicMark, Program, University, Requirement, Bursary
-from Chatbot.bot import chatbot_response
+from Chatbot.bot import chatbot_response, chatbot_responses, chatbot_status, start_loading as start_chatbot, start_watcher as watch_chatbot, reload_in_background as reload_chatbot
+from Chatbot.stream import stream_reply, cancel_stream
+from routes.reports import remove_orphaned_report_files
+from routes.web_scrapping import remove_orphaned_uploads
 from Database.backup import backup_database, restore_latest_backup
 from weasyprint import HTML
 import tempfile
@@ -14,7 +17,25 @@ import json
 from functools import wraps
 from flask import flash
 
-app = create_app()
+# Building the app has no side effects: PDF extraction workers are spawned
+# processes that re-import this module (as __mp_main__). Everything that
+# touches files or starts threads lives in start_services().
+app = create_app(init_database=False)
+
+
+def start_services():
+    """Process start-up work; call once before serving (see wsgi.py)."""
+    initialize_database(app)
+    removed = remove_orphaned_report_files()
+    if removed:
+        print(f"🧹 Removed {removed} orphaned report file(s).")
+    removed = remove_orphaned_uploads()
+    if removed:
+        print(f"🧹 Removed {removed} interrupted upload(s).")
+    # Fit/load the chatbot knowledge base in the background instead of at import
+    start_chatbot()
+    # Pick up edits to student_questions.json / rules.json without a restart
+    watch_chatbot()
 
 # --- Routes for template pages ---
 @app.route('/')
@@ -117,23 +138,81 @@ def admin_logout():
     return redirect(url_for('home_page'))
 
 
+EXIT_WORDS = {"exit", "quit", "bye", "done", "goodbye", "stop"}
+GOODBYE = "Goodbye! 👋 Have a great day ahead!"
+# Most messages accepted by one /ask/batch call
+ASK_BATCH_MAX = 200
+
 @app.route('/ask', methods=['POST'])
 def ask():
     user_message = request.json.get("message", "").strip().lower()
     if not request.is_json:
         return jsonify({"reply": "Invalid request"}), 400
 
+    return jsonify({"reply": reply_to(user_message)})
+
+def reply_to(user_message):
     # Exit/Goodbye handling
-    exit_words = ["exit", "quit", "bye", "done", "goodbye", "stop"]
-    if user_message in exit_words:
-        reply = "Goodbye! 👋 Have a great day ahead!"
+    if user_message in EXIT_WORDS:
+        return GOODBYE
+    try:
+        return chatbot_response(user_message)
+    except Exception as e:
+        return f"Something unexpected happened ({e}). Please try again."
+
+@app.route('/ask/stream', methods=['GET', 'POST'])
+def ask_stream():
+    # Same reply as /ask, as Server-Sent Events (start, chunk..., done) with heartbeats while it is computed.
+    # POST takes {"message": ...}; GET takes ?message= for EventSource clients.
+    if request.method == 'POST':
+        if not request.is_json:
+            return jsonify({"reply": "Invalid request"}), 400
+        user_message = request.json.get("message", "")
     else:
-        try:
-            reply = chatbot_response(user_message)
-        except Exception as e:
-            reply = f"Something unexpected happened ({e}). Please try again."
+        user_message = request.args.get("message", "")
+    user_message = user_message.strip().lower()
 
-    return jsonify({"reply": reply})
+    @copy_current_request_context
+    def compute():
+        return reply_to(user_message)
+
+    return Response(stream_with_context(stream_reply(compute)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/ask/stream/<stream_id>', methods=['DELETE'])
+def cancel_ask_stream(stream_id):
+    return jsonify({"cancelled": cancel_stream(stream_id)})
+
+@app.route('/ask/batch', methods=['POST'])
+def ask_batch():
+    # {"messages": [...]} -> {"replies": [...]} in the same order; one retrieval pass for the batch
+    if not request.is_json:
+        return jsonify({"error": "Invalid request"}), 400
+    messages = request.json.get("messages")
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        return jsonify({"error": "messages must be a list of strings"}), 400
+    if len(messages) > ASK_BATCH_MAX:
+        return jsonify({"error": f"At most {ASK_BATCH_MAX} messages per batch"}), 400
+
+    messages = [m.strip().lower() for m in messages]
+    try:
+        answered = iter(chatbot_responses([m for m in messages if m not in EXIT_WORDS]))
+    except Exception as e:
+        return jsonify({"error": f"Something unexpected happened ({e}). Please try again."}), 500
+    replies = [GOODBYE if m in EXIT_WORDS else next(answered) for m in messages]
+    return jsonify({"replies": replies})
+
+@app.route('/ask/status')
+def ask_status():
+    # Readiness of the chatbot knowledge base (idle, loading, ready, failed), its last error and last reload
+    return jsonify(chatbot_status())
+
+@app.route('/admin/chatbot/reload', methods=['POST'])
+@admin_required
+def reload_chatbot_kb():
+    # The rebuild runs off the request path; /ask keeps using the current snapshot until the swap
+    started = reload_chatbot()
+    return jsonify({"success": True, "started": started, "status": chatbot_status()}), 202
 
 @app.route('/start-search')
 @login_required
@@ -244,5 +323,6 @@ def forget_password():
     return render_template('Login/forgot_password.html', show_chatbot = False)
 
 if __name__ == '__main__':
+    start_services()
     # Runs the Flask development server
     app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""add deadline indexes
+
+Revision ID: add_deadline_indexes
+Revises: add_fees_to_program
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_deadline_indexes'
+down_revision = 'add_fees_to_program'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Chatbot deadline lookups filter and sort on these columns; databases set up
+    # by the app already have them (Database/__init__.py upgrade_schema)
+    op.create_index('ix_bursary_deadline', 'bursary', ['deadline'], if_not_exists=True)
+    op.create_index('ix_admission_application_deadline', 'admission', ['application_deadline'],
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_admission_application_deadline', table_name='admission')
+    op.drop_index('ix_bursary_deadline', table_name='bursary')
@@ -0,0 +1,77 @@
+"""dedupe scraped programs and track imported prospectuses
+
+Revision ID: add_ws_import_dedupe
+Revises: add_deadline_indexes
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_ws_import_dedupe'
+down_revision = 'add_deadline_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _normalize(name):
+    # same rule as routes.web_scrapping.normalize_program_name, frozen here
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (name or "").lower().replace("&", " and ")).split())
+
+
+def upgrade():
+    # Databases set up by the app already have these (Database/__init__.py upgrade_schema)
+    inspector = sa.inspect(op.get_bind())
+    if 'ws_import' not in inspector.get_table_names():
+        _create_ws_import()
+    if 'normalized_name' not in {c['name'] for c in inspector.get_columns('ws_program')}:
+        _add_normalized_name()
+
+
+def _create_ws_import():
+    op.create_table(
+        'ws_import',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('university_id', sa.Integer(), sa.ForeignKey('ws_university.id'), nullable=False),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('filename', sa.String(255)),
+        sa.Column('programs', sa.Integer()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.UniqueConstraint('university_id', 'content_hash', name='_ws_import_hash_uc')
+    )
+
+
+def _add_normalized_name():
+    op.add_column('ws_program', sa.Column('normalized_name', sa.String(150), nullable=True))
+
+    # Backfill the key and drop duplicates left by repeated imports, keeping the newest row
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, university_id, program_name FROM ws_program ORDER BY id DESC")).all()
+    seen = set()
+    updates, duplicates = [], []
+    for row_id, university_id, program_name in rows:
+        key = (university_id, _normalize(program_name))
+        if key in seen:
+            duplicates.append({'id': row_id})
+        else:
+            seen.add(key)
+            updates.append({'id': row_id, 'normalized_name': key[1]})
+    if duplicates:
+        conn.execute(sa.text("DELETE FROM ws_program WHERE id = :id"), duplicates)
+    if updates:
+        conn.execute(sa.text("UPDATE ws_program SET normalized_name = :normalized_name WHERE id = :id"), updates)
+
+    with op.batch_alter_table('ws_program', schema=None) as batch_op:
+        batch_op.alter_column('normalized_name', existing_type=sa.String(150), nullable=False)
+        batch_op.create_unique_constraint('_ws_program_name_uc', ['university_id', 'normalized_name'])
+
+
+def downgrade():
+    with op.batch_alter_table('ws_program', schema=None) as batch_op:
+        batch_op.drop_constraint('_ws_program_name_uc', type_='unique')
+        batch_op.drop_column('normalized_name')
+    op.drop_table('ws_import')
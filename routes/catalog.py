@@ -0,0 +1,131 @@
+"""Process-wide snapshot of the program catalog used by the course matcher.
+
+compute_matches used to load every Program and then run one Requirement query
+per program on each request. The snapshot below is built once (two queries),
+kept in memory in a compact read-only form and thrown away whenever the course
+admin endpoints commit a change, so a match request costs no catalog queries.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+from Database.__init__ import db
+from Database.models import Program, University, Requirement
+
+# Safety net for multi-worker deployments: another process may have edited the
+# catalog, so a snapshot is never trusted for longer than this (seconds).
+CATALOG_MAX_AGE = 600
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1]
+
+
+# A plain decimal once ',', 'R' and spaces are gone: "R 45,000.50" but not "1e5",
+# "-5" or "nan", which float() would accept. courses._fee_value_expr is the SQL twin.
+_PLAIN_FEE = re.compile(r'[0-9]*\.?[0-9]*')
+
+
+def parse_fee(fee):
+    if not fee:
+        return None
+    fee_str = str(fee).replace(',', '').replace('R', '').replace(' ', '')
+    if not _PLAIN_FEE.fullmatch(fee_str) or not any(c.isdigit() for c in fee_str):
+        return None
+    return float(fee_str)
+
+
+class CatalogRequirement:
+    __slots__ = ('required_subject', 'min_grade_percentage', 'is_prerequisite')
+
+    def __init__(self, required_subject, min_grade_percentage, is_prerequisite):
+        self.required_subject = required_subject
+        self.min_grade_percentage = min_grade_percentage
+        self.is_prerequisite = is_prerequisite
+
+
+class CatalogProgram:
+    """Plain, session-independent copy of a Program row and its University."""
+    __slots__ = ('program_id', 'program_name', 'description', 'degree_type',
+                 'duration_years', 'location', 'study_mode', 'fees', 'fee_value',
+                 'university_name', 'province_state', 'requirements',
+                 'term_counts', 'term_norm')
+
+    def __init__(self, program, university, requirements):
+        self.program_id = program.program_id
+        self.program_name = program.program_name
+        self.description = program.description
+        self.degree_type = program.degree_type
+        self.duration_years = program.duration_years
+        self.location = program.location
+        self.study_mode = program.study_mode
+        self.fees = program.fees
+        self.fee_value = parse_fee(program.fees)
+        self.university_name = university.name if university else ''
+        self.province_state = university.province_state if university else ''
+        self.requirements = tuple(requirements)
+
+        program_text = ' '.join(filter(None, [program.program_name, program.description,
+                                              program.degree_type, program.location]))
+        self.term_counts = Counter(tokenize(program_text))
+        self.term_norm = math.sqrt(sum(v * v for v in self.term_counts.values()))
+
+
+class ProgramCatalog:
+    def __init__(self, programs, version):
+        self.programs = tuple(programs)
+        self.version = version
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.programs)
+
+    def is_expired(self):
+        return time.time() - self.built_at > CATALOG_MAX_AGE
+
+
+_lock = threading.Lock()
+_catalog = None
+_version = 0
+
+
+def _build_catalog(version):
+    rows = db.session.query(Program, University)\
+        .join(University)\
+        .order_by(Program.program_id)\
+        .all()
+
+    reqs_by_program = {}
+    for r in Requirement.query.order_by(Requirement.program_id, Requirement.requirement_id).all():
+        reqs_by_program.setdefault(r.program_id, []).append(
+            CatalogRequirement(r.required_subject, r.min_grade_percentage,
+                               getattr(r, 'is_prerequisite', True)))
+
+    programs = [CatalogProgram(p, u, reqs_by_program.get(p.program_id, ())) for p, u in rows]
+    return ProgramCatalog(programs, version)
+
+
+def get_catalog():
+    """Return the current catalog snapshot, building it on first use."""
+    global _catalog, _version
+    catalog = _catalog
+    if catalog is not None and not catalog.is_expired():
+        return catalog
+    with _lock:
+        if _catalog is None or _catalog.is_expired():
+            # every rebuild gets a new version so anything derived from an
+            # older snapshot can tell it is stale
+            _version += 1
+            _catalog = _build_catalog(_version)
+        return _catalog
+
+
+def invalidate_catalog():
+    """Drop the snapshot; call after any commit that changes programs or requirements."""
+    global _catalog
+    with _lock:
+        _catalog = None
@@ -1,47 +1,43 @@
-from flask import Blueprint, request, jsonify, render_template, session, url_for, send_file
+from flask import Blueprint, request, jsonify, render_template, session, url_for, send_file, current_app
 from Database.__init__ import db
-from Database.models import Program, Student, Preference, AcademicMark, Requirement, University, Report, LikedCourse
+from Database.models import Program, Student, Preference, AcademicMark, University, Report, LikedCourse
+from routes.catalog import invalidate_catalog, tokenize
+from routes.matcher import get_engine
+from routes.subjects import resolve_grades
+from routes.match_cache import match_cache, student_fingerprint
+from routes.reports import report_jobs, report_path, find_saved_report, apply_report_retention
+from sqlalchemy import and_, case, func, cast, Float
+from sqlalchemy.orm import contains_eager, defer
+from collections import Counter
+import hashlib
+import io
 import json
+import numpy as np
 from weasyprint import HTML
-import tempfile
 import os
 from datetime import datetime
-import shutil
 
 courses = Blueprint('courses', __name__)
 
+
+def catalog_changed():
+    """Drop everything derived from the program catalog after an admin commit."""
+    invalidate_catalog()
+    match_cache.clear()
+
+
 # Course Management Routes
 @courses.route('/manage')
 def manage_courses():
-    # Get all universities for the dropdown
-    universities = University.query.all()
-    
-    # Get all courses with their university information
-    courses = db.session.query(Program, University)\
-        .join(University)\
-        .order_by(University.name, Program.program_name)\
-        .all()
-
-    # Convert to a format suitable for the template
-    course_list = []
-    for program, university in courses:
-        requirements = Requirement.query.filter_by(program_id=program.program_id).all()
-        course_list.append({
-            'id': program.program_id,
-            'title': program.program_name,
-            'description': program.description,
-            'college': university.name,
-            'college_id': university.university_id,
-            'duration': f"{program.duration_years} years",
-            'degree_type': program.degree_type,
-            'location': program.location,
-            'study_mode': program.study_mode,
-            'requirements': requirements
-        })
+    # The page is a shell: static/js/course_management.js fetches the courses
+    # one keyset page at a time from /courses/all, so nothing is queried here
+    return render_template('Admin/course_management.html')
 
-    return render_template('Admin/course_management.html', 
-                         courses=course_list,
-                         universities=universities)
+
+def match_limit():
+    """Read the optional ?limit= (top-K) parameter; missing or invalid means no limit."""
+    limit = request.args.get('limit', type=int)
+    return limit if limit and limit > 0 else None
 
 
 # NOTE: earlier versions had a second set of REST endpoints here which caused
@@ -56,7 +52,7 @@ def get_matches():
     if not student_id:
         return jsonify({'error': 'Not logged in'}), 401
 
-    matches, student_obj, pref_dict, marks_dict = compute_matches(student_id)
+    matches, student_obj, pref_dict, marks_dict = compute_matches(student_id, k=match_limit())
     if matches is None:
         return jsonify({'error': 'Missing preferences or academic marks'}), 400
 
@@ -66,10 +62,17 @@ def get_matches():
                          marks=marks_dict)
 
 
-def compute_matches(student_id):
+def compute_matches(student_id, k=None):
     """Compute and return a list of matching program dicts for the given student_id.
     Returns (matches, student_obj, pref_dict, marks_dict) or (None, None, None, None)
     if the student doesn't have sufficient data.
+
+    With k set only the k best programs are ranked and returned; the full
+    nested payload is built for those programs only.
+
+    Results are cached per student (see routes/match_cache.py), so the returned
+    matches, pref_dict and marks_dict may be shared with other requests and
+    must be treated as read-only.
     """
     # Get student preferences
     preferences = Preference.query.filter_by(student_id=student_id).first()
@@ -79,6 +82,15 @@ def compute_matches(student_id):
     if not preferences or not academic_marks:
         return (None, None, None, None)
 
+    engine = get_engine()
+    fingerprint = student_fingerprint(preferences, academic_marks, engine.catalog.version)
+    cached = match_cache.get(student_id, fingerprint)
+    if cached is not None:
+        matches, pref_dict, marks_dict, cached_k = cached
+        # a cached full list (or a longer top-k list) answers any shorter request
+        if cached_k is None or (k is not None and k <= cached_k):
+            return (matches[:k] if k is not None else matches, student_obj, pref_dict, marks_dict)
+
     # Convert preferences
     raw_location = (preferences.preferred_location or '')
     province = raw_location.split(',')[0].strip() if raw_location else ''
@@ -94,65 +106,6 @@ def compute_matches(student_id):
 
     # Convert marks to dict for easy lookup
     marks_dict = {mark.subject_name: mark.grade_or_percentage for mark in academic_marks}
-    # Create a list of (subject_name, grade) for fuzzy matching
-    marks_items = list(marks_dict.items())
-
-    def normalize_subject(name: str) -> str:
-        if not name:
-            return ''
-        # lower, remove non-word characters, collapse spaces
-        return re.sub(r"\W+", ' ', name).strip().lower()
-
-    def find_best_mark(req_subject: str):
-        """Try to find the student's grade for a requirement subject.
-
-        Strategy:
-        - exact match
-        - normalized exact match
-        - substring match (req in mark or mark in req)
-        - token overlap (choose best overlap)
-        Returns a float grade or None if not found.
-        """
-        if not req_subject:
-            return None
-        # exact
-        if req_subject in marks_dict:
-            return marks_dict[req_subject]
-
-        req_norm = normalize_subject(req_subject)
-        # normalized exact
-        for s, g in marks_items:
-            if normalize_subject(s) == req_norm:
-                return g
-
-        # substring
-        for s, g in marks_items:
-            s_norm = normalize_subject(s)
-            if req_norm in s_norm or s_norm in req_norm:
-                return g
-
-        # token overlap score
-        req_tokens = set(req_norm.split())
-        best_score = 0.0
-        best_grade = None
-        for s, g in marks_items:
-            s_tokens = set(normalize_subject(s).split())
-            if not s_tokens or not req_tokens:
-                continue
-            inter = req_tokens.intersection(s_tokens)
-            score = len(inter) / max(len(req_tokens), 1)
-            if score > best_score:
-                best_score = score
-                best_grade = g
-
-        # require at least 0.4 overlap to accept
-        if best_score >= 0.4:
-            return best_grade
-
-        return None
-
-    # Query programs (we'll do looser filtering in Python to avoid strict DB mismatches)
-    potential_programs = Program.query.join(University).all()
 
     # Filter by max tuition fee if set
     max_fee = None
@@ -162,38 +115,6 @@ def compute_matches(student_id):
         except Exception:
             max_fee = None
 
-    if max_fee is not None:
-        def parse_fee(fee):
-            if not fee:
-                return None
-            fee_str = str(fee).replace(',', '').replace('R', '').replace(' ', '')
-            try:
-                return float(fee_str)
-            except Exception:
-                return None
-        potential_programs = [p for p in potential_programs if parse_fee(getattr(p, 'fees', None)) is not None and parse_fee(getattr(p, 'fees', None)) <= max_fee]
-
-    # Scoring helpers
-    from collections import Counter
-    import re, math
-    def tokenize(text):
-        if not text:
-            return []
-        return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1]
-    def vectorize_counter(tokens):
-        return Counter(tokens)
-    def cosine_sim(c1, c2):
-        if not c1 or not c2:
-            return 0.0
-        dot = 0
-        for k, v in c1.items():
-            dot += v * c2.get(k, 0)
-        norm1 = math.sqrt(sum(v * v for v in c1.values()))
-        norm2 = math.sqrt(sum(v * v for v in c2.values()))
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        return dot / (norm1 * norm2)
-
     # Build student text profile
     student_text_parts = []
     if preferences.focus_area:
@@ -209,94 +130,43 @@ def compute_matches(student_id):
         pass
     student_text = ' '.join([str(p) for p in student_text_parts if p])
     student_tokens = tokenize(student_text)
-    student_vec = vectorize_counter(student_tokens)
+    student_vec = Counter(student_tokens)
+
+    # Score every catalog program at once; requirement subjects are resolved
+    # through the shared subject index once per distinct subject
+    programs = engine.catalog.programs
+    grade_by_subject = resolve_grades(engine.subjects, marks_dict)
+    subject_grades = np.array([np.nan if grade_by_subject[subj] is None else grade_by_subject[subj]
+                               for subj in engine.subjects], dtype=np.float64)
+    scores = engine.score(subject_grades, student_vec, pref_dict, max_fee, k=k)
+
+    # Optional debug: if DEBUG_MATCHER=1, print programs where none of the
+    # requirements matched any student marks to help troubleshooting subject name mismatches.
+    if os.getenv('DEBUG_MATCHER') == '1':
+        for program in programs:
+            if max_fee is not None and (program.fee_value is None or program.fee_value > max_fee):
+                continue
+            if program.requirements and not any(grade_by_subject[r.required_subject] for r in program.requirements):
+                print(f"[MATCHER DEBUG] Program '{program.program_name}' has requirements but no matching student marks.")
+                print("  Requirements:", [r.required_subject for r in program.requirements])
+                print("  Student marks:", list(marks_dict.items()))
 
     matches = []
-    for program in potential_programs:
-        requirements = Requirement.query.filter_by(program_id=program.program_id).all()
-
-        # Compute requirement satisfaction ratio (0..1) and requirement met status
-        req_met_count = 0
+    for idx, match_score, req_ratio, text_sim in zip(scores.indices, scores.match_score,
+                                                     scores.req_ratio, scores.text_sim):
+        program = programs[idx]
         reqs_with_status = []
-        for r in requirements:
-            # Try to map the requirement subject to a student mark using fuzzy matching
-            student_grade = find_best_mark(r.required_subject)
+        for r in program.requirements:
+            student_grade = grade_by_subject[r.required_subject]
             if student_grade is None:
                 student_grade = 0
-            met = student_grade >= r.min_grade_percentage
             reqs_with_status.append({
                 'required_subject': r.required_subject,
                 'min_grade_percentage': r.min_grade_percentage,
-                'is_prerequisite': getattr(r, 'is_prerequisite', True),
+                'is_prerequisite': r.is_prerequisite,
                 'student_grade': student_grade,
-                'met': met
+                'met': student_grade >= r.min_grade_percentage
             })
-            if met:
-                req_met_count += 1
-        req_ratio = req_met_count / len(requirements) if requirements else 1.0
-
-        # Optional debug: if DEBUG_MATCHER=1, print programs where none of the
-        # requirements matched any student marks to help troubleshooting subject name mismatches.
-        if os.getenv('DEBUG_MATCHER') == '1' and requirements:
-            any_scores = any((req['student_grade'] and req['student_grade'] > 0) for req in reqs_with_status)
-            if not any_scores:
-                print(f"[MATCHER DEBUG] Program '{program.program_name}' has requirements but no matching student marks.")
-                print("  Requirements:", [r['required_subject'] for r in reqs_with_status])
-                print("  Student marks:", marks_items)
-
-        # Text similarity
-        program_text = ' '.join(filter(None, [program.program_name, program.description, program.degree_type, program.location]))
-        prog_tokens = tokenize(program_text)
-        prog_vec = vectorize_counter(prog_tokens)
-        text_sim = cosine_sim(student_vec, prog_vec)
-
-        # Degree match
-        degree_match = 0.0
-        if program.degree_type:
-            for d in pref_dict.get('preferred_degrees', []):
-                try:
-                    if program.degree_type.lower() == str(d).lower():
-                        degree_match = 1.0
-                        break
-                except Exception:
-                    continue
-
-        # Study mode match
-        study_mode_match = 1.0 if pref_dict.get('study_mode') and program.study_mode and pref_dict.get('study_mode').lower() in (program.study_mode or '').lower() else 0.0
-
-        # Location handling
-        location_bonus = 0.0
-        prog_state = (program.university.province_state or '').lower() if program.university else ''
-        if pref_dict.get('relocate'):
-            if prog_state and prog_state != pref_dict.get('location'):
-                location_bonus = -0.05
-        else:
-            if prog_state and prog_state != pref_dict.get('location'):
-                continue
-
-        # Surplus score
-        surplus_score = 0.0
-        if requirements:
-            total_surplus = 0.0
-            counted = 0
-            for req in requirements:
-                student_mark = find_best_mark(req.required_subject)
-                if student_mark is not None:
-                    surplus = max(0.0, (student_mark - req.min_grade_percentage) / max(1.0, req.min_grade_percentage))
-                    total_surplus += surplus
-                    counted += 1
-            if counted:
-                surplus_score = total_surplus / counted
-
-        score = (
-            0.45 * req_ratio +
-            0.30 * text_sim +
-            0.10 * degree_match +
-            0.10 * study_mode_match +
-            0.05 * surplus_score +
-            location_bonus
-        )
-        raw_score = max(0.0, min(1.0, score)) * 100
 
         # Build a nested structure so templates can access program and university attributes
         matches.append({
@@ -305,25 +175,26 @@ def compute_matches(student_id):
                 'program_name': program.program_name,
                 'description': program.description,
                 'degree_type': program.degree_type,
-                'duration_years': getattr(program, 'duration_years', None),
-                'location': getattr(program, 'location', ''),
-                'study_mode': getattr(program, 'study_mode', ''),
-                'fees': getattr(program, 'fees', ''),
+                'duration_years': program.duration_years,
+                'location': program.location,
+                'study_mode': program.study_mode,
+                'fees': program.fees,
                 'requirements': reqs_with_status
             },
             'university': {
-                'name': program.university.name if program.university else '',
-                'province_state': program.university.province_state if program.university else ''
+                'name': program.university_name,
+                'province_state': program.province_state
             },
             'location': program.location,
             'study_mode': program.study_mode,
             'degree_type': program.degree_type,
-            'match_score': int(round(raw_score)),
-            'req_ratio': req_ratio,
-            'text_sim': round(text_sim, 3)
+            'match_score': int(match_score),
+            'req_ratio': float(req_ratio),
+            'text_sim': round(float(text_sim), 3)
         })
 
-    matches.sort(key=lambda x: x['match_score'], reverse=True)
+    rows = len(matches) + sum(len(m['program']['requirements']) for m in matches)
+    match_cache.put(student_id, fingerprint, (matches, pref_dict, marks_dict, k), rows)
     return (matches, student_obj, pref_dict, marks_dict)
 
 
@@ -332,7 +203,7 @@ def debug_matches():
     student_id = session.get('student_id')
     if not student_id:
         return jsonify({'error': 'Not logged in'}), 401
-    matches, student_obj, pref_dict, marks_dict = compute_matches(student_id)
+    matches, student_obj, pref_dict, marks_dict = compute_matches(student_id, k=match_limit())
     if matches is None:
         return jsonify({'error': 'Missing preferences or academic marks'}), 400
     return jsonify({'matches': matches, 'preferences': pref_dict, 'marks': marks_dict})
@@ -433,6 +304,7 @@ def add_course():
         )
         db.session.add(new_course)
         db.session.commit()
+        catalog_changed()
         return jsonify({'success': True, 'course_id': new_course.program_id})
     except Exception as e:
         print(e)
@@ -457,6 +329,7 @@ def edit_course(course_id):
         course.location = data.get('location', '')
         course.study_mode = data.get('study_mode', '')
         db.session.commit()
+        catalog_changed()
         return jsonify({'success': True})
     except Exception as e:
         print(e)
@@ -473,6 +346,7 @@ def delete_course(course_id):
     try:
         db.session.delete(course)
         db.session.commit()
+        catalog_changed()
         return jsonify({'success': True})
     except Exception as e:
         print(e)
@@ -480,113 +354,271 @@ def delete_course(course_id):
         return jsonify({'success': False, 'error': str(e)})
         
 
+# Fields /courses/all can return, keyed by their JSON name
+COURSE_FIELDS = {
+    'id': lambda c: c.program_id,
+    'title': lambda c: c.program_name,
+    'description': lambda c: c.description,
+    'college': lambda c: c.university.name if c.university else 'N/A',
+    'university_id': lambda c: c.university_id,
+    'duration': lambda c: c.duration_years,
+    'degree_type': lambda c: c.degree_type,
+    'fees': lambda c: c.fees or '',
+    'location': lambda c: c.location or '',
+    'study_mode': lambda c: c.study_mode or ''
+}
+COURSES_PAGE_SIZE = 50
+COURSES_MAX_PAGE_SIZE = 200
+PAGINATION_PARAMS = ('limit', 'cursor', 'fields', 'degree_type', 'study_mode', 'university', 'min_fee', 'max_fee')
+
+
+def _fee_value_expr():
+    """SQL twin of catalog.parse_fee: strip ',', 'R' and spaces, then cast.
+
+    Both accept the same grammar: digits with at most one '.', at least one
+    digit. SQLite casts any text ('contact' -> 0.0), so anything else is NULL
+    here and None in parse_fee. A fee of 0 is kept by both.
+    """
+    cleaned = func.replace(func.replace(func.replace(Program.fees, ',', ''), 'R', ''), ' ', '')
+    is_number = and_(
+        cleaned.op('GLOB')('*[0-9]*'),        # at least one digit
+        ~cleaned.op('GLOB')('*[^0-9.]*'),     # nothing but digits and '.'
+        ~cleaned.op('GLOB')('*.*.*')          # at most one '.'
+    )
+    return case((is_number, cast(cleaned, Float)), else_=None)
+
+
+def _arg(name, type_):
+    """(value, error response) for an optional query parameter; malformed values are an error, not ignored."""
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None, None
+    try:
+        return type_(raw), None
+    except ValueError:
+        return None, (jsonify({'error': f'Invalid {name}: {raw!r}'}), 400)
+
+
 # Return all courses as JSON
 @courses.route('/all', methods=['GET'])
 def get_all_courses():
-    all_courses = Program.query.join(University).all()  # Join University table
-    courses_list = [
-        {
-            'id': c.program_id,
-            'title': c.program_name,
-            'description': c.description,
-            'college': c.university.name if c.university else 'N/A',
-            'duration': c.duration_years,
-            'degree_type': c.degree_type,
-            'fees': c.fees or '',
-            'location': c.location or '',
-            'study_mode': c.study_mode or ''
-        }
-        for c in all_courses
-    ]
-    return jsonify(courses_list)
+    """List courses.
+
+    Without query parameters this returns every course as a JSON array (legacy).
+    With any of limit, cursor, fields or the filters it returns one keyset page:
+    { items: [...], next_cursor: <program_id or null> }
+
+    - limit: page size, at least 1 (default 50, capped at 200)
+    - cursor: next_cursor from the previous page
+      (a malformed limit, cursor or fee is a 400, not silently ignored)
+    - fields: comma-separated subset of COURSE_FIELDS
+    - degree_type, study_mode, university (id or name), min_fee, max_fee: filters;
+      courses whose fee parse_fee can't read are left out when a fee filter is set
+
+    Pages carry an ETag, so an unchanged page comes back as 304 Not Modified.
+    """
+    query = Program.query.join(University).options(contains_eager(Program.university))
+
+    if not any(p in request.args for p in PAGINATION_PARAMS):
+        courses_list = [{name: get(c) for name, get in COURSE_FIELDS.items()}
+                        for c in query.order_by(Program.program_id).all()]
+        return jsonify(courses_list)
+
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(COURSE_FIELDS)
+    unknown = [f for f in fields if f not in COURSE_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    if 'description' not in fields:
+        query = query.options(defer(Program.description))
+
+    limit, error = _arg('limit', int)
+    if error:
+        return error
+    if limit is not None and limit < 1:
+        return jsonify({'error': f'Invalid limit: {limit} (must be at least 1)'}), 400
+    limit = min(limit or COURSES_PAGE_SIZE, COURSES_MAX_PAGE_SIZE)
+    cursor, error = _arg('cursor', int)
+    if error:
+        return error
+    if cursor is not None:
+        query = query.filter(Program.program_id > cursor)
+
+    degree_type = request.args.get('degree_type')
+    if degree_type:
+        query = query.filter(func.lower(Program.degree_type) == degree_type.lower())
+    study_mode = request.args.get('study_mode')
+    if study_mode:
+        query = query.filter(Program.study_mode.ilike(f'%{study_mode}%'))
+    university = request.args.get('university')
+    if university:
+        if university.isdigit():
+            query = query.filter(Program.university_id == int(university))
+        else:
+            query = query.filter(University.name.ilike(f'%{university}%'))
+    min_fee, error = _arg('min_fee', float)
+    if error:
+        return error
+    max_fee, error = _arg('max_fee', float)
+    if error:
+        return error
+    if min_fee is not None or max_fee is not None:
+        fee = _fee_value_expr()
+        query = query.filter(fee.isnot(None))
+        if min_fee is not None:
+            query = query.filter(fee >= min_fee)
+        if max_fee is not None:
+            query = query.filter(fee <= max_fee)
+
+    rows = query.order_by(Program.program_id).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].program_id if len(rows) > limit else None
+    items = [{name: COURSE_FIELDS[name](c) for name in fields} for c in rows[:limit]]
+
+    response = jsonify({'items': items, 'next_cursor': next_cursor})
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 
 # report generation
+REPORT_TEMPLATE = 'Reports/course_report.html'
+
+
+def report_digest(matches, pref_dict, marks_dict):
+    """Content hash of everything a course report is rendered from.
+
+    The template source is part of the hash, so editing the template
+    invalidates previously saved reports.
+    """
+    template_source = current_app.jinja_env.loader.get_source(current_app.jinja_env, REPORT_TEMPLATE)[0]
+    payload = json.dumps({
+        'matches': matches,
+        'preferences': pref_dict,
+        'marks': marks_dict,
+        'template': hashlib.sha256(template_source.encode('utf-8')).hexdigest()
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_report_pdf(job, student_id, filename, rendered_html):
+    """Report job body: render the PDF into the student's report folder and record a Report row.
+
+    The PDF is written once, straight to its final path (via a .part file that
+    is renamed into place). If it cannot be stored, it is rendered into memory
+    instead. Returns {'report_id', 'filename', 'pdf_path', 'pdf_bytes'}:
+    pdf_path/report_id are set when the report was saved, pdf_bytes when not.
+    """
+    job.update(10, 'Rendering PDF')
+    dest_path = report_path(student_id, filename)
+    part_path = dest_path + '.part'
+    try:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        HTML(string=rendered_html).write_pdf(part_path)
+        os.replace(part_path, dest_path)
+    except OSError as e:
+        print("Error writing report:", e)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return {'report_id': None, 'filename': filename, 'pdf_path': None,
+                'pdf_bytes': HTML(string=rendered_html).write_pdf()}
+
+    job.update(80, 'Saving report')
+    report_id = None
+    try:
+        # the row may survive a file that went missing; reuse it
+        report = Report.query.filter_by(student_id=student_id, filename=filename).first()
+        if not report:
+            report = Report(
+                student_id=student_id,
+                title="Course Matches Report",
+                filename=filename,
+                created_at=datetime.utcnow()
+            )
+            db.session.add(report)
+            db.session.commit()
+        report_id = report.report_id
+        apply_report_retention(student_id)
+    except Exception as e:
+        print("Error saving report:", e)
+        db.session.rollback()
+
+    return {'report_id': report_id, 'filename': filename, 'pdf_path': dest_path, 'pdf_bytes': None}
+
+
 @courses.route('/download-report')
 def download_report():
-    """Generate and download a PDF report of course matches and save it to disk/DB.
-
-    - If request is AJAX/fetch (Accept: application/json or X-Requested-With header), returns JSON:
-      { success: True, report: { id, title, filename, created_at }, download_url: '/reports/<id>/download' }
-    - Otherwise returns the PDF directly (legacy behavior).
+    """Generate a PDF report of course matches and save it to disk/DB.
+
+    Reports are content-addressed: the filename carries a hash of the ranked
+    matches, preferences, marks and template, so asking again with unchanged
+    inputs reuses the saved PDF and Report row instead of rendering again.
+    New reports are rendered on the report job queue (routes/reports.py).
+
+    - If request is AJAX/fetch (Accept: application/json or X-Requested-With header):
+      - an identical saved report returns 200 straight away:
+        { success: True, cached: True, report: {...}, download_url: '/reports/<id>/download' }
+      - otherwise returns 202 with a job handle:
+        { success: True, job: { id, status, progress, ... }, status_url: '/api/reports/jobs/<job_id>' }
+        Poll status_url until status is 'done'; it then carries report and download_url.
+    - Otherwise returns the PDF directly (legacy behavior), waiting for the job if needed.
     """
     student_id = session.get('student_id')
     if not student_id:
         return jsonify({'error': 'Not logged in'}), 401
 
     # Compute matches
-    matches, student_obj, pref_dict, marks_dict = compute_matches(student_id)
+    matches, student_obj, pref_dict, marks_dict = compute_matches(student_id, k=match_limit())
     if matches is None:
-        # If AJAX, return JSON error; else return JSON too (existing behavior uses JSON)
-        if 'application/json' in request.headers.get('Accept', '') or request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.args.get('ajax') == '1':
-            return jsonify({'error': 'Missing preferences or academic marks'}), 400
         return jsonify({'error': 'Missing preferences or academic marks'}), 400
 
+    # Detect AJAX / fetch call
+    accept = request.headers.get('Accept', '')
+    is_ajax = 'application/json' in accept or request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.args.get('ajax') == '1'
+
     student = Student.query.get(student_id)
+    student_name = (student.name.replace(' ', '_') if student and getattr(student, 'name', None) else 'Student')
+    digest = report_digest(matches, pref_dict, marks_dict)
+    filename = f"{student_name}_Course_Matches_Report_{digest[:16]}.pdf"
+
+    saved_report = find_saved_report(student_id, filename)
+    if saved_report:
+        if is_ajax:
+            return jsonify({
+                'success': True,
+                'cached': True,
+                'report': saved_report.to_dict(),
+                'download_url': url_for('reports.download_saved_report', report_id=saved_report.report_id)
+            })
+        return send_file(
+            report_path(student_id, filename),
+            as_attachment=True,
+            download_name=filename,
+            mimetype='application/pdf'
+        )
 
-    # Render the report HTML and create a temporary PDF
-    rendered_html = render_template('Reports/course_report.html',
+    # Render the report HTML here; the slow HTML -> PDF step goes to a worker
+    rendered_html = render_template(REPORT_TEMPLATE,
                                     student=student,
                                     matches=matches,
                                     preferences=pref_dict,
                                     marks=marks_dict,
                                     now=datetime.now())
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as pdf_file:
-        HTML(string=rendered_html).write_pdf(pdf_file.name)
-
-    # Build stable filename and save copy to persistent folder
-    student_name = (student.name.replace(' ', '_') if student and getattr(student, 'name', None) else 'Student')
-    filename = f"{student_name}_Course_Matches_Report_{int(datetime.utcnow().timestamp())}.pdf"
-
-    base_reports_dir = os.path.join(os.path.dirname(__file__), 'uploads', 'reports')
-    os.makedirs(base_reports_dir, exist_ok=True)
-    student_dir = os.path.join(base_reports_dir, str(student_id))
-    os.makedirs(student_dir, exist_ok=True)
-
-    dest_path = os.path.join(student_dir, filename)
-    saved_report = None
-    try:
-        shutil.copy(pdf_file.name, dest_path)
-
-        # create DB record (ensure Report is imported at top of file)
-        new_report = Report(
-            student_id=student_id,
-            title="Course Matches Report",
-            filename=filename,
-            created_at=datetime.utcnow()
-        )
-        db.session.add(new_report)
-        db.session.commit()
-        saved_report = new_report
-    except Exception as e:
-        print("Error saving report:", e)
-        db.session.rollback()
-
-    # Detect AJAX / fetch call
-    accept = request.headers.get('Accept', '')
-    is_ajax = 'application/json' in accept or request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.args.get('ajax') == '1'
+    job = report_jobs.submit(build_report_pdf, student_id, filename, rendered_html,
+                             owner=student_id, key=(student_id, filename))
 
     if is_ajax:
-        if saved_report:
-            download_url = url_for('reports.download_saved_report', report_id=saved_report.report_id)
-            return jsonify({
-                'success': True,
-                'report': {
-                    'id': saved_report.report_id,
-                    'title': saved_report.title,
-                    'filename': saved_report.filename,
-                    'created_at': saved_report.created_at.isoformat()
-                },
-                'download_url': download_url
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Could not save report on server.'}), 500
-
-    # Non-AJAX: return the generated PDF (legacy)
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'status_url': url_for('reports.report_job_status', job_id=job.id)
+        }), 202
+
+    # Non-AJAX: wait for the worker, then return the generated PDF (legacy)
+    job.wait()
+    if job.status != 'done':
+        return jsonify({'success': False, 'error': job.error or 'Could not generate report.'}), 500
     return send_file(
-        pdf_file.name,
+        job.result['pdf_path'] or io.BytesIO(job.result['pdf_bytes']),
         as_attachment=True,
-        download_name=filename,
+        download_name=job.result['filename'],
         mimetype='application/pdf'
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,109 @@
+"""Small in-process background job queue.
+
+Slow work (PDF rendering, prospectus imports) is handed to a worker pool so the
+request thread can return straight away with a job id. Each job records its
+status and progress and runs inside an application context, so it can use the
+database and templates like a normal view.
+
+Jobs live in memory only: a restart forgets them, and a job can only be polled
+on the worker process that created it.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+# How long finished jobs stay pollable (seconds)
+JOB_RETENTION = 3600
+
+
+class Job:
+    def __init__(self, kind, owner=None, key=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.key = key
+        self.status = 'queued'      # queued -> running -> done | failed
+        self.progress = 0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def update(self, progress=None, message=None):
+        if progress is not None:
+            self.progress = progress
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns True if it did."""
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error
+        }
+
+
+class JobQueue:
+    def __init__(self, name, max_workers=2):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, owner=None, key=None, **kwargs):
+        """Queue fn(job, *args, **kwargs) and return its Job straight away.
+
+        If key is given and an unfinished job with the same key exists, that
+        job is returned instead of queueing the same work twice.
+        """
+        app = current_app._get_current_object()
+        with self._lock:
+            self._prune()
+            if key is not None:
+                for existing in self._jobs.values():
+                    if existing.key == key and not existing.finished:
+                        return existing
+            job = Job(self.name, owner=owner, key=key)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, app, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, app, job, fn, args, kwargs):
+        job.status = 'running'
+        try:
+            with app.app_context():
+                job.result = fn(job, *args, **kwargs)
+            job.progress = 100
+            job.status = 'done'
+        except Exception as e:
+            app.logger.exception("%s job %s failed", self.name, job.id)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
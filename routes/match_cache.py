@@ -0,0 +1,95 @@
+"""Per-student cache of ranked match results.
+
+The matching page, /courses/debug_matches and /courses/download-report all
+call compute_matches with the same inputs. Results are cached per student and
+tagged with a fingerprint of the student's Preference/AcademicMark rows plus
+the catalog version, so a stale entry can never be served even if an
+invalidation was missed (e.g. the write happened in another worker).
+
+Eviction is LRU, entries expire after MATCH_CACHE_TTL seconds, and the total
+number of cached match rows is capped so memory stays bounded no matter how
+large the catalog grows.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MATCH_CACHE_MAX_ENTRIES = int(os.getenv('MATCH_CACHE_MAX_ENTRIES', 512))
+MATCH_CACHE_MAX_ROWS = int(os.getenv('MATCH_CACHE_MAX_ROWS', 50000))
+MATCH_CACHE_TTL = float(os.getenv('MATCH_CACHE_TTL', 900))
+
+
+def student_fingerprint(preferences, academic_marks, catalog_version):
+    """Hash everything compute_matches reads for one student."""
+    payload = {
+        'catalog': catalog_version,
+        'preference': [
+            preferences.preferred_location, preferences.preferred_degrees,
+            preferences.max_tuition_fee, preferences.focus_area, preferences.relocate,
+            preferences.study_mode, preferences.career_interests, preferences.nsfas
+        ],
+        'marks': [[m.subject_name, m.grade_or_percentage] for m in academic_marks]
+    }
+    return hashlib.sha1(json.dumps(payload, default=str).encode('utf-8')).hexdigest()
+
+
+class MatchCache:
+    def __init__(self, max_entries=MATCH_CACHE_MAX_ENTRIES, max_rows=MATCH_CACHE_MAX_ROWS,
+                 ttl=MATCH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # student_id -> (fingerprint, expires_at, rows, value)
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_id, fingerprint):
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if entry is None or entry[0] != fingerprint or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(student_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(student_id)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, student_id, fingerprint, value, rows):
+        """Store value; rows is its size in match rows and counts toward max_rows."""
+        if rows > self.max_rows:
+            return
+        with self._lock:
+            if student_id in self._entries:
+                self._drop(student_id)
+            self._entries[student_id] = (fingerprint, time.monotonic() + self.ttl, rows, value)
+            self._rows += rows
+            while self._entries and (len(self._entries) > self.max_entries or self._rows > self.max_rows):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, student_id):
+        with self._lock:
+            if student_id in self._entries:
+                self._drop(student_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def _drop(self, student_id):
+        entry = self._entries.pop(student_id)
+        self._rows -= entry[2]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'rows': self._rows,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+match_cache = MatchCache()
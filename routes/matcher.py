@@ -0,0 +1,213 @@
+"""Vectorized scoring of every catalog program for one student.
+
+The catalog snapshot (routes/catalog.py) is laid out as arrays once per catalog
+version:
+
+- a sparse program x term count matrix plus per-program norms (text similarity)
+- the program x subject requirement matrix in coordinate form, so a program can
+  list the same subject more than once
+- integer-encoded degree type, study mode and province columns
+- parsed fees (NaN when a fee could not be parsed)
+
+score() then rates all programs with a handful of array operations and returns
+the same match_score / req_ratio / text_sim the old per-program loop produced.
+With k set it only ranks the best k programs, skipping the text similarity of
+programs that cannot make the cut.
+"""
+import heapq
+import math
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from routes.catalog import get_catalog
+
+
+def _encode(values):
+    """Map lower-cased strings to integer codes; empty values get -1."""
+    index = {}
+    codes = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        value = (value or '').lower()
+        if not value:
+            codes[i] = -1
+            continue
+        codes[i] = index.setdefault(value, len(index))
+    return codes, list(index)
+
+
+def _lookup(codes, vocabulary, predicate):
+    """Evaluate predicate once per distinct value and broadcast it back to rows."""
+    # the trailing False is what code -1 (empty value) indexes into
+    table = np.array([bool(predicate(v)) for v in vocabulary] + [False])
+    return table[codes]
+
+
+class MatchScores:
+    """Per-program score components for the programs that survived filtering."""
+
+    def __init__(self, indices, match_score, req_ratio, text_sim):
+        self.indices = indices          # positions in catalog.programs, ranked
+        self.match_score = match_score  # int percentages, aligned with indices
+        self.req_ratio = req_ratio
+        self.text_sim = text_sim
+
+
+class MatchEngine:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        programs = catalog.programs
+        n = len(programs)
+
+        # Program x term counts
+        self.vocabulary = {}
+        rows, cols, vals = [], [], []
+        for i, p in enumerate(programs):
+            for term, count in p.term_counts.items():
+                rows.append(i)
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                vals.append(count)
+        self.term_matrix = csr_matrix((np.array(vals, dtype=np.float64), (rows, cols)),
+                                      shape=(n, len(self.vocabulary)))
+        self.term_norms = np.array([p.term_norm for p in programs], dtype=np.float64)
+
+        # Program x subject minimum grades, one entry per requirement row
+        subject_index = {}
+        req_program, req_subject, req_min = [], [], []
+        for i, p in enumerate(programs):
+            for r in p.requirements:
+                req_program.append(i)
+                req_subject.append(subject_index.setdefault(r.required_subject, len(subject_index)))
+                req_min.append(r.min_grade_percentage)
+        self.subjects = list(subject_index)
+        self.req_program = np.array(req_program, dtype=np.int64)
+        self.req_subject = np.array(req_subject, dtype=np.int64)
+        self.req_min = np.array(req_min, dtype=np.float64)
+        self.req_counts = np.bincount(self.req_program, minlength=n)
+
+        self.fee_values = np.array([np.nan if p.fee_value is None else p.fee_value for p in programs],
+                                   dtype=np.float64)
+        self.degree_codes, self.degrees = _encode([p.degree_type for p in programs])
+        self.mode_codes, self.modes = _encode([p.study_mode for p in programs])
+        self.province_codes, self.provinces = _encode([p.province_state for p in programs])
+
+    def __len__(self):
+        return len(self.catalog.programs)
+
+    def requirement_grades(self, subject_grades):
+        """Expand per-subject grades (NaN = no matching mark) to per-requirement grades."""
+        return subject_grades[self.req_subject]
+
+    def score(self, subject_grades, student_terms, pref_dict, max_fee=None, k=None):
+        """Score every program.
+
+        subject_grades: array aligned with self.subjects, NaN where the student
+        has no matching mark. student_terms: Counter of the student's profile
+        tokens. Returns MatchScores ranked by match_score (stable on catalog order),
+        cut to the best k programs when k is given.
+        """
+        n = len(self)
+        keep = np.ones(n, dtype=bool)
+        if max_fee is not None:
+            keep &= ~np.isnan(self.fee_values)
+            keep[keep] = self.fee_values[keep] <= max_fee
+
+        # Requirements: unresolved subjects count as a grade of 0
+        grades = self.requirement_grades(subject_grades)
+        resolved = ~np.isnan(grades)
+        filled = np.where(resolved, grades, 0.0)
+        met = filled >= self.req_min
+        met_count = np.bincount(self.req_program, weights=met, minlength=n)
+        has_reqs = self.req_counts > 0
+        req_ratio = np.ones(n, dtype=np.float64)
+        req_ratio[has_reqs] = met_count[has_reqs] / self.req_counts[has_reqs]
+
+        surplus = np.maximum(0.0, (filled - self.req_min) / np.maximum(1.0, self.req_min))
+        total_surplus = np.bincount(self.req_program, weights=np.where(resolved, surplus, 0.0), minlength=n)
+        counted = np.bincount(self.req_program, weights=resolved, minlength=n)
+        surplus_score = np.zeros(n, dtype=np.float64)
+        np.divide(total_surplus, counted, out=surplus_score, where=counted > 0)
+
+        wanted_degrees = {str(d).lower() for d in pref_dict.get('preferred_degrees', [])}
+        degree_match = _lookup(self.degree_codes, self.degrees, lambda d: d in wanted_degrees).astype(np.float64)
+
+        mode = pref_dict.get('study_mode')
+        study_mode_match = _lookup(self.mode_codes, self.modes,
+                                   lambda m: mode and mode.lower() in m).astype(np.float64)
+
+        location = pref_dict.get('location')
+        elsewhere = _lookup(self.province_codes, self.provinces, lambda s: s != location)
+        location_bonus = np.zeros(n, dtype=np.float64)
+        if pref_dict.get('relocate'):
+            location_bonus[elsewhere] = -0.05
+        else:
+            keep &= ~elsewhere
+
+        def combine(text_sim, rows=slice(None)):
+            score = (
+                0.45 * req_ratio[rows] +
+                0.30 * text_sim +
+                0.10 * degree_match[rows] +
+                0.10 * study_mode_match[rows] +
+                0.05 * surplus_score[rows] +
+                location_bonus[rows]
+            )
+            return np.rint(np.clip(score, 0.0, 1.0) * 100).astype(np.int64)
+
+        candidates = np.flatnonzero(keep)
+        if k is not None and k < len(candidates):
+            # text_sim lies in [0, 1], so every program's final score is bracketed
+            # by its score at text_sim=0 and text_sim=1. Once k programs are known
+            # to reach a score, anything whose upper bound falls below it is out.
+            lower = combine(0.0, candidates)
+            upper = combine(1.0, candidates)
+            kth_best = np.partition(lower, len(lower) - k)[len(lower) - k]
+            candidates = candidates[upper >= kth_best]
+
+        text_sim = self.text_similarity(student_terms, candidates)
+        match_score = combine(text_sim, candidates)
+
+        if k is not None and k < len(candidates):
+            # bounded heap; ties keep catalog order like the full stable sort
+            order = heapq.nlargest(k, range(len(candidates)),
+                                   key=lambda i: (match_score[i], -candidates[i]))
+            order = np.array(order, dtype=np.int64)
+        else:
+            order = np.argsort(-match_score, kind='stable')
+        indices = candidates[order]
+        return MatchScores(indices, match_score[order], req_ratio[indices], text_sim[order])
+
+    def text_similarity(self, student_terms, rows):
+        """Cosine between the student's and each given program's raw term counts."""
+        text_sim = np.zeros(len(rows), dtype=np.float64)
+        student_norm = math.sqrt(sum(v * v for v in student_terms.values()))
+        if not student_norm or not len(rows):
+            return text_sim
+        student_vec = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for term, count in student_terms.items():
+            col = self.vocabulary.get(term)
+            if col is not None:
+                student_vec[col] = count
+        dot = self.term_matrix[rows] @ student_vec
+        norms = self.term_norms[rows]
+        nonzero = norms > 0
+        text_sim[nonzero] = dot[nonzero] / (student_norm * norms[nonzero])
+        return text_sim
+
+
+_lock = threading.Lock()
+_engine = None
+
+
+def get_engine():
+    """Return the engine for the current catalog snapshot, rebuilding it when the catalog changes."""
+    global _engine
+    catalog = get_catalog()
+    engine = _engine
+    if engine is not None and engine.catalog is catalog:
+        return engine
+    with _lock:
+        if _engine is None or _engine.catalog is not catalog:
+            _engine = MatchEngine(catalog)
+        return _engine
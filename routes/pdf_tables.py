@@ -0,0 +1,289 @@
+"""Parallel raw table extraction from prospectus PDFs.
+
+page.extract_tables() is CPU-bound and by far the slowest part of an import.
+Pages are independent, so page ranges are handed to a process pool and the
+per-page tables come back keyed by page number. Everything that depends on
+row order (continuation rows, see routes/web_scrapping.py) stays in the parent.
+
+Raw per-page output is also cached on disk, keyed by the PDF's SHA-256, the
+page number and the extraction settings (pdfplumber version and
+TABLE_SETTINGS). Re-running the cleaning stages over a PDF that was seen
+before (say after changing IGNORE_KEYWORDS) reads JSON instead of re-parsing
+pages. Changing TABLE_SETTINGS or upgrading pdfplumber starts a fresh cache
+key; set WS_TABLE_CACHE=0 to turn the cache off.
+
+The cache lives in WS_TABLE_CACHE_DIR, else the app's WS_TABLE_CACHE_DIR
+config, else <instance folder>/table_cache. After each run PDFs unused for
+WS_TABLE_CACHE_MAX_AGE_DAYS are dropped, then the least recently used ones
+until the cache fits in WS_TABLE_CACHE_MAX_MB.
+
+This module only imports pdfplumber so pool workers start quickly.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+# Worker processes for table extraction (default: one per CPU)
+EXTRACT_WORKERS = int(os.getenv('WS_EXTRACT_WORKERS', os.cpu_count() or 1))
+# Pages handed to a worker at a time
+PAGES_PER_TASK = int(os.getenv('WS_PAGES_PER_TASK', 8))
+# pdfplumber table_settings passed to extract_tables(); part of the cache key
+TABLE_SETTINGS = {}
+TABLE_CACHE_ENABLED = os.getenv('WS_TABLE_CACHE', '1') != '0'
+TABLE_CACHE_DIR = os.getenv('WS_TABLE_CACHE_DIR')
+TABLE_CACHE_MAX_AGE = float(os.getenv('WS_TABLE_CACHE_MAX_AGE_DAYS', 30)) * 24 * 3600
+TABLE_CACHE_MAX_BYTES = int(float(os.getenv('WS_TABLE_CACHE_MAX_MB', 500)) * 1024 * 1024)
+# Instance folder of the app when there is no app context (same place Flask puts it)
+_DEFAULT_INSTANCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+
+_lock = threading.Lock()
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: the web process runs threads, which fork does not copy safely.
+            # Workers re-import the main module, so app.py must stay free of
+            # import-time side effects (see start_services there).
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next _get_pool() starts a fresh one."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def settings_key(table_settings=None):
+    """Short hash of everything besides the PDF bytes that shapes extract_tables() output."""
+    payload = json.dumps({'pdfplumber': pdfplumber.__version__,
+                          'table_settings': TABLE_SETTINGS if table_settings is None else table_settings},
+                         sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def table_cache_dir():
+    if TABLE_CACHE_DIR:
+        return TABLE_CACHE_DIR
+    # imported here so pool workers do not pay for Flask
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return current_app.config.get('WS_TABLE_CACHE_DIR') or os.path.join(current_app.instance_path, 'table_cache')
+    return os.path.join(_DEFAULT_INSTANCE_PATH, 'table_cache')
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def prune_table_cache(cache_dir=None, max_age=None, max_bytes=None, keep=()):
+    """Drop cached PDFs unused for max_age seconds, then the least recently used
+    until the cache fits in max_bytes. PDF hashes in keep are never dropped.
+    Returns the number of PDFs removed.
+    """
+    cache_dir = cache_dir or table_cache_dir()
+    max_age = TABLE_CACHE_MAX_AGE if max_age is None else max_age
+    max_bytes = TABLE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        entries = [(entry.stat().st_mtime, entry.path, _dir_size(entry.path))
+                   for entry in os.scandir(cache_dir) if entry.is_dir() and entry.name not in keep]
+    except OSError:
+        return 0
+
+    kept_size = sum(_dir_size(os.path.join(cache_dir, name)) for name in keep)
+    total = kept_size + sum(size for _, _, size in entries)
+    cutoff = time.time() - max_age
+    removed = 0
+    for used_at, path, size in sorted(entries):  # least recently used first
+        if used_at >= cutoff and total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+class PageTableCache:
+    """On-disk cache of raw extract_tables() output: <dir>/<pdf hash>/<settings key>/<page>.json."""
+
+    def __init__(self, pdf_hash, cache_dir=None, table_settings=None):
+        self.root = os.path.join(cache_dir or table_cache_dir(), pdf_hash)
+        self.path = os.path.join(self.root, settings_key(table_settings))
+
+    def touch(self):
+        """Mark the PDF as used just now (pruning drops the least recently used first)."""
+        try:
+            os.utime(self.root)
+        except OSError:
+            pass
+
+    def _write(self, name, data):
+        os.makedirs(self.path, exist_ok=True)
+        target = os.path.join(self.path, name)
+        with open(target + '.part', 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(target + '.part', target)
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.path, name), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def page_count(self):
+        meta = self._read('pages.json')
+        return meta['pages'] if meta else None
+
+    def set_page_count(self, total):
+        try:
+            self._write('pages.json', {'pages': total})
+        except OSError as e:
+            # a full or read-only disk only costs us the cache
+            print(f"Could not cache the page count: {e}")
+
+    def get(self, number):
+        return self._read(f'{number}.json')
+
+    def put(self, number, tables):
+        try:
+            self._write(f'{number}.json', tables)
+        except OSError as e:
+            # a full or read-only disk only costs us the cache
+            print(f"Could not cache tables for page {number}: {e}")
+
+
+def page_count(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_tables(pdf_path, first, last, table_settings=None):
+    """Raw extract_tables() output for pages first..last-1 (0-based): [(page_number, tables)]."""
+    with pdfplumber.open(pdf_path) as pdf:
+        out = []
+        for number in range(first, last):
+            page = pdf.pages[number]
+            out.append((number, page.extract_tables(table_settings or {})))
+            page.flush_cache()
+        return out
+
+
+def _ranges(pages):
+    """Split sorted page numbers into contiguous (first, last) ranges of at most PAGES_PER_TASK pages."""
+    ranges = []
+    for number in pages:
+        if ranges and ranges[-1][1] == number and number - ranges[-1][0] < PAGES_PER_TASK:
+            ranges[-1][1] = number + 1
+        else:
+            ranges.append([number, number + 1])
+    return [tuple(r) for r in ranges]
+
+
+def _extract(pdf_path, ranges):
+    """Yield [(page_number, tables)] per range as ranges finish, in parallel when it pays off."""
+    if len(ranges) <= 1 or EXTRACT_WORKERS <= 1:
+        # not worth a round trip through the pool
+        for first, last in ranges:
+            yield extract_page_tables(pdf_path, first, last, TABLE_SETTINGS)
+        return
+
+    pending = list(ranges)
+    for attempt in (1, 2):
+        pool = _get_pool()
+        futures = {}
+        try:
+            for first, last in pending:
+                futures[pool.submit(extract_page_tables, pdf_path, first, last, TABLE_SETTINGS)] = (first, last)
+            for future in as_completed(futures):
+                pages = future.result()
+                pending.remove(futures[future])
+                yield pages
+            return
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM-killed): the pool is unusable from now on
+            _discard_pool(pool)
+            if attempt == 2:
+                raise
+            print(f"Table extraction worker died; retrying {len(pending)} page range(s) on a new pool")
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def iter_page_tables(pdf_path, progress=None, pdf_hash=None):
+    """Yield (page_number, tables) for every page, in page order.
+
+    Cached pages are read from disk; the rest are extracted in parallel and
+    cached. Results are released in order as soon as every earlier page is
+    ready. progress(done_pages, total_pages) is called as pages become ready.
+    pdf_hash saves re-hashing a file whose SHA-256 is already known.
+    """
+    cache = None
+    if TABLE_CACHE_ENABLED:
+        pdf_hash = pdf_hash or file_sha256(pdf_path)
+        cache = PageTableCache(pdf_hash)
+    total = cache.page_count() if cache else None
+    if total is None:
+        total = page_count(pdf_path)
+        if cache:
+            cache.set_page_count(total)
+
+    ready = {}
+    if cache:
+        for number in range(total):
+            tables = cache.get(number)
+            if tables is not None:
+                ready[number] = tables
+    missing = [number for number in range(total) if number not in ready]
+    done_pages = len(ready)
+    if progress and done_pages:
+        progress(done_pages, total)
+
+    next_page = 0
+    while next_page in ready:
+        yield next_page, ready.pop(next_page)
+        next_page += 1
+
+    for pages in _extract(pdf_path, _ranges(missing)):
+        for number, tables in pages:
+            if cache:
+                cache.put(number, tables)
+            ready[number] = tables
+        done_pages += len(pages)
+        if progress:
+            progress(done_pages, total)
+        while next_page in ready:
+            yield next_page, ready.pop(next_page)
+            next_page += 1
+
+    if cache:
+        cache.touch()
+        prune_table_cache(os.path.dirname(cache.root), keep=(pdf_hash,))
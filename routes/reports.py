@@ -1,7 +1,9 @@
-from flask import Blueprint, jsonify, session, send_file, abort
+from flask import Blueprint, jsonify, session, send_file, abort, url_for
 import os
+import time
 from Database.__init__ import db
 from Database.models import Report
+from routes.jobs import JobQueue
 from datetime import datetime
 
 reports = Blueprint('reports', __name__)
@@ -9,6 +11,66 @@ reports = Blueprint('reports', __name__)
 # base folder must match where courses.save stored files
 REPORTS_BASE = os.path.join(os.path.dirname(__file__), 'uploads', 'reports')
 
+# WeasyPrint is slow and CPU-heavy: render PDFs on a small worker pool
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))
+report_jobs = JobQueue('reports', max_workers=REPORT_WORKERS)
+
+# Saved reports kept per student; older ones are deleted (row and file)
+REPORTS_KEEP_PER_STUDENT = int(os.getenv('REPORTS_KEEP_PER_STUDENT', 10))
+
+
+# Leftovers older than this (seconds) are treated as orphaned
+ORPHAN_MAX_AGE = 24 * 3600
+
+
+def remove_orphaned_report_files(max_age=ORPHAN_MAX_AGE):
+    """Delete .part files left in the reports tree by interrupted renders."""
+    cutoff = time.time() - max_age
+    candidates = []
+    if os.path.isdir(REPORTS_BASE):
+        for student_dir in os.scandir(REPORTS_BASE):
+            if student_dir.is_dir():
+                candidates += [e for e in os.scandir(student_dir.path) if e.name.endswith('.part')]
+
+    removed = 0
+    for entry in candidates:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def report_path(student_id, filename):
+    return os.path.join(REPORTS_BASE, str(student_id), filename)
+
+
+def find_saved_report(student_id, filename):
+    """Return the student's Report with this filename if its file is still on disk."""
+    report = Report.query.filter_by(student_id=student_id, filename=filename).first()
+    if report and os.path.exists(report_path(student_id, filename)):
+        return report
+    return None
+
+
+def apply_report_retention(student_id, keep=REPORTS_KEEP_PER_STUDENT):
+    """Delete all but the newest `keep` reports of a student, files included."""
+    old = Report.query.filter_by(student_id=student_id)\
+        .order_by(Report.created_at.desc(), Report.report_id.desc())\
+        .offset(keep).all()
+    if not old:
+        return 0
+    for report in old:
+        try:
+            os.remove(report_path(student_id, report.filename))
+        except OSError:
+            pass
+        db.session.delete(report)
+    db.session.commit()
+    return len(old)
+
 @reports.route('/api/reports', methods=['GET'])
 def api_get_reports():
     student_id = session.get('student_id')
@@ -19,6 +81,28 @@ def api_get_reports():
     out = [r.to_dict() for r in reports_q]
     return jsonify({'reports': out})
 
+@reports.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """Poll a report generation job started by /courses/download-report."""
+    student_id = session.get('student_id')
+    if not student_id:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    job = report_jobs.get(job_id)
+    if not job or job.owner != student_id:
+        return jsonify({'error': 'Job not found'}), 404
+
+    out = job.to_dict()
+    if job.status == 'done':
+        report = Report.query.get(job.result['report_id']) if job.result.get('report_id') else None
+        if report:
+            out['report'] = report.to_dict()
+            out['download_url'] = url_for('reports.download_saved_report', report_id=report.report_id)
+        else:
+            out['status'] = 'failed'
+            out['error'] = 'Could not save report on server.'
+    return jsonify(out)
+
 @reports.route('/reports/<int:report_id>/download', methods=['GET'])
 def download_saved_report(report_id):
     student_id = session.get('student_id')
@@ -33,9 +117,9 @@ def download_saved_report(report_id):
         return abort(403)
 
     # Build path and send file
-    student_dir = os.path.join(REPORTS_BASE, str(student_id))
-    file_path = os.path.join(student_dir, report.filename)
+    file_path = report_path(student_id, report.filename)
     if not os.path.exists(file_path):
         return jsonify({'error': 'File not found on server'}), 404
 
+    # send_file hands the path to the WSGI server's file wrapper (sendfile where available)
     return send_file(file_path, as_attachment=True, download_name=report.filename, mimetype='application/pdf')
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for
 from Database.models import db, AcademicMark, Preference, Student
+from routes.match_cache import match_cache
 import json
 
 search = Blueprint('search', __name__)
@@ -135,6 +136,7 @@ def save_data():
         db.session.add(new_pref)
 
     db.session.commit()
+    match_cache.invalidate(student_id)
     return jsonify({'message': 'Data saved successfully!'}), 201
 
 @search.route('/get_student_data', methods=['GET'])
@@ -0,0 +1,149 @@
+"""Shared resolver mapping requirement subjects to a student's academic marks.
+
+Requirement subjects ("Physical Science") rarely match the names students type
+for their marks ("Physical Sciences", "English Home Language"). The index
+below keeps a normalized alias table and a token -> names inverted index built
+from every Requirement.required_subject and AcademicMark.subject_name, so
+resolution is a dictionary lookup and the fuzzy fallbacks run once per
+(requirement subject, student subject list) and are then memoized.
+
+The matcher and report code both go through resolve_marks / resolve_grades so a
+subject is matched the same way everywhere.
+"""
+import re
+import threading
+from functools import lru_cache
+
+from Database.__init__ import db
+from Database.models import Requirement, AcademicMark
+
+# Minimum share of requirement tokens a mark name must contain to be accepted
+TOKEN_OVERLAP_CUTOFF = 0.4
+
+
+@lru_cache(maxsize=4096)
+def normalize_subject(name):
+    if not name:
+        return ''
+    # lower, remove non-word characters, collapse spaces
+    return re.sub(r"\W+", ' ', name).strip().lower()
+
+
+class SubjectIndex:
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self._aliases = {}   # raw name -> normalized name
+        self._tokens = {}    # normalized name -> frozenset of tokens
+        self._postings = {}  # token -> set of normalized names containing it
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Register a subject name and return its normalized form."""
+        norm = self._aliases.get(name)
+        if norm is not None:
+            return norm
+        norm = normalize_subject(name)
+        with self._lock:
+            self._aliases[name] = norm
+            if norm not in self._tokens:
+                tokens = frozenset(norm.split())
+                self._tokens[norm] = tokens
+                for token in tokens:
+                    self._postings.setdefault(token, set()).add(norm)
+        return norm
+
+    def tokens(self, name):
+        return self._tokens[self.add(name)]
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def resolve(self, req_subject, mark_names):
+        """Return the name in mark_names that best matches req_subject, or None.
+
+        mark_names is the student's subject names in their original order
+        (a tuple, so the result can be memoized). Strategy, first hit wins:
+        exact name, normalized name, substring either way, then the best
+        token overlap of at least TOKEN_OVERLAP_CUTOFF.
+        """
+        return _resolve(self, req_subject, mark_names)
+
+    def _resolve_uncached(self, req_subject, mark_names):
+        if not req_subject:
+            return None
+        # exact
+        if req_subject in mark_names:
+            return req_subject
+
+        req_norm = self.add(req_subject)
+        mark_norms = [(name, self.add(name)) for name in mark_names]
+        # normalized exact
+        for name, norm in mark_norms:
+            if norm == req_norm:
+                return name
+
+        # substring
+        for name, norm in mark_norms:
+            if req_norm in norm or norm in req_norm:
+                return name
+
+        # token overlap: only names sharing at least one token can score
+        req_tokens = self._tokens[req_norm]
+        if not req_tokens:
+            return None
+        sharing = set()
+        for token in req_tokens:
+            sharing |= self._postings.get(token, set())
+        best_score = 0.0
+        best_name = None
+        for name, norm in mark_norms:
+            if norm not in sharing:
+                continue
+            score = len(req_tokens & self._tokens[norm]) / len(req_tokens)
+            if score > best_score:
+                best_score = score
+                best_name = name
+        return best_name if best_score >= TOKEN_OVERLAP_CUTOFF else None
+
+
+@lru_cache(maxsize=65536)
+def _resolve(index, req_subject, mark_names):
+    return index._resolve_uncached(req_subject, mark_names)
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def build_subject_index():
+    names = [r[0] for r in db.session.query(Requirement.required_subject).distinct()]
+    names += [m[0] for m in db.session.query(AcademicMark.subject_name).distinct()]
+    return SubjectIndex(names)
+
+
+def get_subject_index():
+    """Return the process-wide index, building it from the database on first use.
+
+    Names that show up later are added on the fly, so the index never needs
+    rebuilding for correctness.
+    """
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = build_subject_index()
+    return _index
+
+
+def resolve_marks(req_subjects, marks_dict):
+    """Map each requirement subject to the matching key of marks_dict (or None)."""
+    index = get_subject_index()
+    mark_names = tuple(marks_dict)
+    return {subject: index.resolve(subject, mark_names) for subject in req_subjects}
+
+
+def resolve_grades(req_subjects, marks_dict):
+    """Map each requirement subject to the student's grade for it (or None)."""
+    return {subject: (marks_dict[name] if name is not None else None)
+            for subject, name in resolve_marks(req_subjects, marks_dict).items()}
@@ -1,16 +1,41 @@
-from flask import request, jsonify
+from flask import request, jsonify, url_for, Response, stream_with_context
 import os
 from flask import Blueprint, render_template
 import re
-import pdfplumber
+import hashlib
+import time
+import uuid
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from sqlalchemy import insert, select, update
 from Database.__init__ import db
-from Database.models import WSProgram, WSUniversity
-import pandas as pd
+from Database.models import WSImport, WSProgram, WSUniversity
+from routes.jobs import JobQueue
+from routes.pdf_tables import iter_page_tables
+from routes.ws_export import FORMATS, MIMETYPES, csv_chunks, export_programs, iter_chunks, max_key, \
+    parquet_stream, program_columns
 
 ws = Blueprint('ws', __name__, url_prefix='/ws')
 VALID_DEGREES = ["Bachelor", "Diploma", "Master", "Certificate", "PhD"]
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploaded prospectuses, stored as <sha256>.pdf
+SPOOL_FOLDER = os.path.join(UPLOAD_FOLDER, 'spool')
+os.makedirs(SPOOL_FOLDER, exist_ok=True)
+# Largest prospectus accepted by /ws/import-pdf
+MAX_UPLOAD_BYTES = int(float(os.getenv('WS_MAX_UPLOAD_MB', 100)) * 1024 * 1024)
+# Bytes read from the request and written to the spool at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Interrupted uploads older than this (seconds) are removed at startup
+ORPHAN_MAX_AGE = 24 * 3600
+
+# Imports run one at a time; each one already fans its pages out over a process pool
+import_jobs = JobQueue('imports', max_workers=int(os.getenv('WS_IMPORT_WORKERS', 1)))
+# programs_export.csv is brought up to date here after each import
+export_jobs = JobQueue('exports', max_workers=1)
+# Rows per executemany INSERT/UPDATE when saving programs
+INSERT_CHUNK_SIZE = int(os.getenv('WS_INSERT_CHUNK_SIZE', 500))
+# Columns compared on re-import; a program is only updated when one of them changed
+UPSERT_FIELDS = ('program_name', 'degree_type', 'duration_years', 'description')
 
 def clean_degree_and_description(program_name, degree_column, other_description=None):
     degree_type = None
@@ -29,116 +54,311 @@ def clean_degree_and_description(program_name, degree_column, other_description=
     description = re.sub(r'\s+', ' ', description).strip()
     return degree_type, description
 
-def extract_programs_from_tables(pdf_path):
-    programs = []
-    if not os.path.exists(pdf_path):
-        print("PDF file not found!")
-        return programs
+IGNORE_KEYWORDS = ["APPLICANT", "PROSPECTUS", "ELIGIBLE", "GENERAL", "ADMISSION",
+                   "REQUIREMENTS", "NOTE", "GUIDELINES"]
+
+def programs_from_page_tables(page_tables):
+    """Turn (page_number, tables) pairs, in page order, into program dicts.
 
-    IGNORE_KEYWORDS = ["APPLICANT", "PROSPECTUS", "ELIGIBLE", "GENERAL", "ADMISSION",
-                       "REQUIREMENTS", "NOTE", "GUIDELINES"]
+    Runs sequentially: a row without a program name continues the description
+    of the previous program, which may sit on an earlier page.
+    """
+    programs = []
     last_program = None
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            for table in tables:
-                for row in table:
-                    if not any(row):
-                        continue
-                    program_name = row[0].strip() if len(row) > 0 and row[0] else None
-                    raw_degree_column = row[1].strip() if len(row) > 1 and row[1] else None
-                    raw_duration_column = row[2].strip() if len(row) > 2 and row[2] else None
-                    raw_description_column = " ".join([c.strip() for c in row[3:] if c]).strip() if len(row) > 3 else None
-
-                    if program_name and any(word in program_name.upper() for word in IGNORE_KEYWORDS):
-                        continue
-
-                    if not program_name and last_program:
-                        if raw_description_column:
-                            last_program['description'] += " " + raw_description_column
-                        continue
-
-                    degree_type, description = clean_degree_and_description(program_name, raw_degree_column, raw_description_column)
-
-                    duration_years = None
-                    if raw_duration_column:
-                        match = re.search(r'(\d+)', raw_duration_column)
-                        if match:
-                            duration_years = int(match.group(1))
-
-                    if not degree_type:
-                        continue
-
-                    program_dict = {
-                        "program_name": program_name,
-                        "degree_type": degree_type,
-                        "duration_years": duration_years,
-                        "description": description
-                    }
-                    programs.append(program_dict)
-                    last_program = program_dict
+    for _, tables in page_tables:
+        for table in tables:
+            for row in table:
+                if not any(row):
+                    continue
+                program_name = row[0].strip() if len(row) > 0 and row[0] else None
+                raw_degree_column = row[1].strip() if len(row) > 1 and row[1] else None
+                raw_duration_column = row[2].strip() if len(row) > 2 and row[2] else None
+                raw_description_column = " ".join([c.strip() for c in row[3:] if c]).strip() if len(row) > 3 else None
+
+                if program_name and any(word in program_name.upper() for word in IGNORE_KEYWORDS):
+                    continue
+
+                if not program_name and last_program:
+                    if raw_description_column:
+                        last_program['description'] += " " + raw_description_column
+                    continue
+
+                degree_type, description = clean_degree_and_description(program_name, raw_degree_column, raw_description_column)
+
+                duration_years = None
+                if raw_duration_column:
+                    match = re.search(r'(\d+)', raw_duration_column)
+                    if match:
+                        duration_years = int(match.group(1))
+
+                if not degree_type:
+                    continue
+
+                program_dict = {
+                    "program_name": program_name,
+                    "degree_type": degree_type,
+                    "duration_years": duration_years,
+                    "description": description
+                }
+                programs.append(program_dict)
+                last_program = program_dict
 
     for prog in programs:
         prog['description'] = re.sub(r'\s+', ' ', prog['description']).strip()
 
     return programs
 
-def save_programs_to_db(programs, university_id):
-    count = 0
+def extract_programs_from_tables(pdf_path, progress=None, pdf_hash=None):
+    """Extract programs from a prospectus PDF.
+
+    Pages are parsed in parallel and their raw tables cached per PDF hash
+    (see routes/pdf_tables.py), so re-running this after changing the
+    cleaning rules only repeats the cheap part.
+    """
+    if not os.path.exists(pdf_path):
+        print("PDF file not found!")
+        return []
+    return programs_from_page_tables(iter_page_tables(pdf_path, progress, pdf_hash))
+
+def normalize_program_name(name):
+    """Upsert key for a program name: "B.Com (Accounting) & Finance" -> "b com accounting and finance"."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (name or "").lower().replace("&", " and ")).split())
+
+def save_programs_to_db(programs, university_id, chunk_size=None, progress=None, source=None):
+    """Upsert programs keyed on (university_id, normalized program name) in one transaction.
+
+    New programs go in as chunked executemany INSERTs and changed ones as
+    chunked UPDATEs by primary key; unchanged rows are not touched. A program
+    listed twice in the same prospectus keeps its last entry. source (an
+    unsaved WSImport) is committed together with the programs.
+    progress(saved, total) is called after each chunk.
+
+    Returns {'inserted', 'updated', 'unchanged'} row counts.
+    """
+    chunk_size = chunk_size or INSERT_CHUNK_SIZE
+    incoming = {}
     for prog in programs:
-        program = WSProgram(
-            university_id=university_id,
-            program_name=prog.get('program_name'),
-            degree_type=prog.get('degree_type'),
-            duration_years=prog.get('duration_years'),
-            description=prog.get('description')
-        )
-        db.session.add(program)
-        count += 1
-    db.session.commit()
-    print(f"Saved {count} programs to DB")
-
-    # Optional: export to CSV
-    programs_db = WSProgram.query.all()
-    programs_list = [
-        {"id": p.id, "university_id": p.university_id,
-         "program_name": p.program_name, "degree_type": p.degree_type,
-         "duration_years": p.duration_years, "description": p.description}
-        for p in programs_db
-    ]
-    df = pd.DataFrame(programs_list)
-    df.to_csv("programs_export.csv", index=False)
-    print("Exported programs to programs_export.csv")
+        key = normalize_program_name(prog.get('program_name'))
+        if not key:
+            continue
+        incoming[key] = {
+            'university_id': university_id,
+            'normalized_name': key,
+            'program_name': prog.get('program_name'),
+            'degree_type': prog.get('degree_type'),
+            'duration_years': prog.get('duration_years'),
+            'description': prog.get('description')
+        }
+
+    existing = {row.normalized_name: row for row in db.session.execute(
+        select(WSProgram.id, WSProgram.normalized_name, *[getattr(WSProgram, f) for f in UPSERT_FIELDS])
+        .where(WSProgram.university_id == university_id))}
+    new_rows, changed_rows = [], []
+    for key, row in incoming.items():
+        old = existing.get(key)
+        if old is None:
+            new_rows.append(row)
+        elif any(getattr(old, f) != row[f] for f in UPSERT_FIELDS):
+            changed_rows.append({'id': old.id, **row})
+
+    total = len(new_rows) + len(changed_rows)
+    count = 0
+    try:
+        for statement, rows in ((insert(WSProgram), new_rows), (update(WSProgram), changed_rows)):
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                db.session.execute(statement, chunk)
+                count += len(chunk)
+                if progress:
+                    progress(count, total)
+        if source is not None:
+            source.programs = len(incoming)
+            db.session.add(source)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    counts = {'inserted': len(new_rows), 'updated': len(changed_rows),
+              'unchanged': len(incoming) - total}
+    print(f"Saved programs to DB: {counts}")
+    return counts
+
+def run_export(job, fmt='csv', full=False):
+    """Export job body: bring the programs export up to date (see routes/ws_export.py)."""
+    return export_programs(fmt, full=full)
+
+def run_import(job, filepath, university_id, uni_name, content_hash=None, filename=None):
+    """Import job body: extract programs from the uploaded PDF and upsert them."""
+    def progress(done_pages, total_pages):
+        # extraction is most of the work; saving gets the last 10%
+        job.update(int(90 * done_pages / max(total_pages, 1)), f'Parsed {done_pages}/{total_pages} pages')
+
+    job.update(0, 'Reading PDF')
+    programs = extract_programs_from_tables(filepath, progress, content_hash)
+    if not programs:
+        raise ValueError('No valid programs found in PDF')
+
+    def saved(count, total):
+        job.update(90 + int(9 * count / total), f'Saved {count}/{total} programs')
+
+    job.update(90, f'Saving {len(programs)} programs')
+    source = None
+    if content_hash:
+        source = WSImport(university_id=university_id, content_hash=content_hash,
+                          filename=filename or os.path.basename(filepath))
+    counts = save_programs_to_db(programs, university_id, progress=saved, source=source)
+    if counts['inserted'] or counts['updated']:
+        # new rows can be appended to the export; updated ones need it rewritten
+        export_jobs.submit(run_export, 'csv', full=bool(counts['updated']))
+    return {'programs': len(programs), 'university': uni_name, **counts}
+
+def spool_upload(stream, max_bytes=None):
+    """Copy an uploaded PDF to its content-addressed spool path in chunks, hashing as it goes.
+
+    Returns (path, sha256 hex, size). The file is written under a unique
+    .part name and renamed to <sha256>.pdf at the end, so concurrent uploads
+    never overwrite each other and an identical file is stored once. Raises
+    ValueError if the data is not a PDF and RequestEntityTooLarge past
+    max_bytes.
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    digest = hashlib.sha256()
+    size = 0
+    part = os.path.join(SPOOL_FOLDER, f'.{uuid.uuid4().hex}.part')
+    try:
+        with open(part, 'wb') as f:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(b'%PDF-'):
+                    raise ValueError('Only PDF files are allowed')
+                size += len(chunk)
+                if size > max_bytes:
+                    raise RequestEntityTooLarge()
+                digest.update(chunk)
+                f.write(chunk)
+        if size == 0:
+            raise ValueError('Uploaded file is empty')
+        path = os.path.join(SPOOL_FOLDER, f'{digest.hexdigest()}.pdf')
+        os.replace(part, path)
+        return path, digest.hexdigest(), size
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+
+def remove_orphaned_uploads(max_age=ORPHAN_MAX_AGE):
+    """Delete .part files left in the spool by interrupted uploads."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(SPOOL_FOLDER):
+        try:
+            if entry.name.endswith('.part') and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
 @ws.route('/import-pdf', methods=['POST'])
 def import_pdf():
+    """Queue a prospectus import.
+
+    The PDF is either the raw request body (Content-Type: application/pdf,
+    university_name and filename in the query string) or the "pdf" field of
+    a multipart form. Either way it is streamed to the spool in chunks; the
+    parse job starts from the spooled file.
+    """
+    # the multipart envelope adds a little on top of the file itself
+    request.max_content_length = MAX_UPLOAD_BYTES + 64 * 1024
     try:
-        if 'pdf' not in request.files:
-            return jsonify({'success': False, 'error': 'No file part'}), 400
-        file = request.files['pdf']
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No selected file'}), 400
-        if not file.filename.lower().endswith('.pdf'):
+        if request.mimetype == 'application/pdf':
+            filename = request.args.get('filename', 'upload.pdf')
+            uni_name = request.args.get('university_name', 'Default University')
+            stream = request.stream
+        else:
+            if 'pdf' not in request.files:
+                return jsonify({'success': False, 'error': 'No file part'}), 400
+            file = request.files['pdf']
+            if file.filename == '':
+                return jsonify({'success': False, 'error': 'No selected file'}), 400
+            filename = file.filename
+            uni_name = request.form.get('university_name', 'Default University')
+            stream = file.stream
+        if not filename.lower().endswith('.pdf'):
             return jsonify({'success': False, 'error': 'Only PDF files are allowed'}), 400
 
-        filepath = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(filepath)
+        try:
+            filepath, content_hash, size = spool_upload(stream)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
         # Find or create university dynamically
-        uni_name = request.form.get('university_name', 'Default University')
         university = WSUniversity.query.filter_by(name=uni_name).first()
         if not university:
             university = WSUniversity(name=uni_name)
             db.session.add(university)
             db.session.commit()
 
-        # Scrape PDF and save programs
-        programs = extract_programs_from_tables(filepath)
-        if not programs:
-            return jsonify({'success': False, 'error': 'No valid programs found in PDF'}), 400
+        # The same file was imported for this university before: nothing to do
+        if WSImport.query.filter_by(university_id=university.id, content_hash=content_hash).first():
+            return jsonify({
+                'success': True,
+                'skipped': True,
+                'message': f'This PDF was already imported for {uni_name}.'
+            })
 
-        save_programs_to_db(programs, university.id)
-
-        return jsonify({'success': True, 'message': f'PDF uploaded and programs saved for {uni_name}!'})
+        # Scrape PDF and save programs in the background; the client polls status_url
+        job = import_jobs.submit(run_import, filepath, university.id, uni_name, content_hash,
+                                 secure_filename(filename), key=(university.id, content_hash))
+        return jsonify({
+            'success': True,
+            'message': f'PDF uploaded, importing programs for {uni_name}...',
+            'job': job.to_dict(),
+            'status_url': url_for('ws.import_job_status', job_id=job.id)
+        }), 202
+    except RequestEntityTooLarge:
+        return jsonify({'success': False,
+                        'error': f'PDF is larger than {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB'}), 413
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@ws.route('/jobs/<job_id>', methods=['GET'])
+def import_job_status(job_id):
+    """Poll a prospectus import started by /ws/import-pdf."""
+    job = import_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    out = job.to_dict()
+    if job.status == 'done':
+        out['result'] = job.result
+        result = job.result
+        out['message'] = (f"Imported {result['programs']} programs for {result['university']}: "
+                          f"{result['inserted']} new, {result['updated']} updated, {result['unchanged']} unchanged.")
+    return jsonify(out)
+
+@ws.route('/export/programs.<fmt>', methods=['GET'])
+def export_programs_download(fmt):
+    """Stream the scraped programs as CSV or Parquet straight from the database.
+
+    ?since=<id> returns only rows added after that id; the X-Export-Watermark
+    header carries the id to pass as since next time.
+    """
+    if fmt not in FORMATS:
+        return jsonify({'error': f'Unknown format; use one of {", ".join(FORMATS)}'}), 404
+    since = request.args.get('since', type=int)
+    columns = program_columns()
+    until = max_key(db.engine, WSProgram.id)
+    chunks = iter_chunks(db.engine, columns, WSProgram.id, after=since, until=until)
+    if fmt == 'csv':
+        body = csv_chunks([c.key for c in columns], chunks)
+    else:
+        try:
+            body = parquet_stream(columns, chunks)
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 501
+    response = Response(stream_with_context(body), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=programs_export.{fmt}'
+    response.headers['X-Export-Watermark'] = str(until if until is not None else since or 0)
+    return response
@@ -0,0 +1,274 @@
+"""Streaming export of scraped programs to CSV or Parquet.
+
+Rows are read in key order through a server-side cursor (stream_results with
+yield_per), EXPORT_CHUNK_SIZE rows at a time, and written out chunk by chunk,
+so memory stays bounded however large the table gets.
+
+Exports are incremental by default. Next to each export sits
+<path>.watermark.json recording the highest key written; the next run only
+adds rows with a larger key. CSV rows are appended to the file, while Parquet
+(which cannot be appended to) gets a new part file in the <name>.parquet/
+dataset directory. Keys only cover inserts: after rows are updated or deleted
+run a full export (run_import asks for one when its upsert updated rows).
+
+Parquet needs pyarrow; CSV has no extra dependencies.
+
+Usage:
+    python -m routes.ws_export                       # bring programs_export.csv up to date
+    python -m routes.ws_export --format parquet --full
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+
+from sqlalchemy import DateTime, Float, Integer, func, select
+
+EXPORT_DIR = os.getenv('WS_EXPORT_DIR', '.')
+# Rows fetched from the cursor and written per chunk (and per Parquet row group)
+EXPORT_CHUNK_SIZE = int(os.getenv('WS_EXPORT_CHUNK_SIZE', 1000))
+FORMATS = ('csv', 'parquet')
+MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def default_path(fmt, name='programs_export'):
+    return os.path.join(EXPORT_DIR, f'{name}.{fmt}')
+
+
+def max_key(engine, key):
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(key))).scalar()
+
+
+def iter_chunks(engine, columns, key, after=None, until=None, chunk_size=None):
+    """Yield lists of row tuples ordered by key, with after < key <= until, from a server-side cursor."""
+    statement = select(*columns).order_by(key)
+    if after is not None:
+        statement = statement.where(key > after)
+    if until is not None:
+        statement = statement.where(key <= until)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True,
+                                        yield_per=chunk_size or EXPORT_CHUNK_SIZE).execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+def csv_chunks(names, chunks, header=True):
+    """CSV text for the header and then one block per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(names)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Parquet export needs pyarrow (pip install pyarrow)') from None
+    return pyarrow
+
+
+def arrow_schema(columns):
+    pa = _pyarrow()
+    fields = []
+    for column in columns:
+        column_type = column.type
+        if isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    return pa.schema(fields)
+
+
+def _arrow_table(pa, schema, chunk):
+    return pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)],
+        schema=schema)
+
+
+def write_parquet(where, schema, chunks):
+    """Write each chunk as a row group to where (a path or writable file)."""
+    pa = _pyarrow()
+    with pa.parquet.ParquetWriter(where, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(_arrow_table(pa, schema, chunk))
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes out in pieces, so Parquet can be streamed."""
+
+    def __init__(self):
+        self._pending = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pending.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._pending)
+        self._pending = []
+        return data
+
+
+def parquet_stream(columns, chunks):
+    """Iterator of Parquet bytes for chunks of rows, one row group per chunk, yielded as they are written.
+
+    Raises RuntimeError straight away (not on first iteration) without pyarrow.
+    """
+    pa = _pyarrow()
+    return _parquet_bytes(pa, arrow_schema(columns), chunks)
+
+
+def _parquet_bytes(pa, schema, chunks):
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks:
+            writer.write_table(_arrow_table(pa, schema, chunk))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _count(chunks, counter):
+    for chunk in chunks:
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def read_watermark(path):
+    try:
+        with open(path + '.watermark.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_watermark(path, watermark):
+    with open(path + '.watermark.json.part', 'w') as f:
+        json.dump(watermark, f)
+    os.replace(path + '.watermark.json.part', path + '.watermark.json')
+
+
+def export_table(engine, columns, key, path, fmt='csv', full=False, chunk_size=None):
+    """Export columns (ordered by key) to path; incremental unless full or no usable watermark.
+
+    Returns {'path', 'format', 'mode', 'rows', 'watermark'}: rows is the
+    number written by this run and watermark the highest key exported.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}; use one of {", ".join(FORMATS)}')
+    names = [column.key for column in columns]
+    previous = None if full else read_watermark(path)
+    if previous and (previous.get('format') != fmt or previous.get('columns') != names
+                     or not os.path.exists(path)):
+        previous = None
+    until = max_key(engine, key)
+    after = previous['key'] if previous else None
+    mode = 'append' if previous else 'full'
+
+    if previous and (until is None or (after is not None and until <= after)):
+        return {'path': path, 'format': fmt, 'mode': mode, 'rows': 0, 'watermark': after}
+
+    counter = [0]
+    chunks = _count(iter_chunks(engine, columns, key, after, until, chunk_size), counter)
+    watermark = {'format': fmt, 'columns': names, 'key': until if until is not None else after}
+
+    if fmt == 'csv':
+        if previous:
+            with open(path, 'r+b') as f:
+                # drop anything a crashed run appended after the last watermark
+                f.truncate(previous['bytes'])
+                f.seek(previous['bytes'])
+                for text in csv_chunks(names, chunks, header=False):
+                    f.write(text.encode('utf-8'))
+        else:
+            with open(path + '.part', 'w', encoding='utf-8', newline='') as f:
+                for text in csv_chunks(names, chunks):
+                    f.write(text)
+            os.replace(path + '.part', path)
+        watermark['bytes'] = os.path.getsize(path)
+    else:
+        schema = arrow_schema(columns)
+        if previous:
+            part = previous['parts']
+            part_path = os.path.join(path, f'part-{part:05d}.parquet')
+            write_parquet(part_path + '.part', schema, chunks)
+            os.replace(part_path + '.part', part_path)
+        else:
+            part = 0
+            building = path + '.part'
+            shutil.rmtree(building, ignore_errors=True)
+            os.makedirs(building)
+            write_parquet(os.path.join(building, 'part-00000.parquet'), schema, chunks)
+            if os.path.exists(path):
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+            os.replace(building, path)
+        watermark['parts'] = part + 1
+
+    _write_watermark(path, watermark)
+    print(f"Exported {counter[0]} rows to {path} ({mode})")
+    return {'path': path, 'format': fmt, 'mode': mode, 'rows': counter[0], 'watermark': watermark['key']}
+
+
+def program_columns():
+    from Database.models import WSProgram
+    return (WSProgram.id, WSProgram.university_id, WSProgram.program_name,
+            WSProgram.degree_type, WSProgram.duration_years, WSProgram.description)
+
+
+def export_programs(fmt='csv', path=None, full=False, chunk_size=None):
+    """Export the ws_program table; needs an app context."""
+    from Database.__init__ import db
+    from Database.models import WSProgram
+    return export_table(db.engine, program_columns(), WSProgram.id, path or default_path(fmt),
+                        fmt, full, chunk_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export scraped programs (ws_program) to CSV or Parquet.')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output', help='export path (default: programs_export.<format> in WS_EXPORT_DIR)')
+    parser.add_argument('--full', action='store_true', help='rewrite the export instead of appending new rows')
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from Database.__init__ import create_app
+    app = create_app()
+    with app.app_context():
+        result = export_programs(args.format, args.output, args.full, args.chunk_size)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
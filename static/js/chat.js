@@ -199,6 +199,7 @@ function addMessageToDOM(text, isUser = false, time = null) {
 
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return p;
 }
 
 // === Add message to chat (wrapper that saves to localStorage) ===
@@ -244,6 +245,105 @@ function removeTypingIndicator() {
     if (typingIndicator) typingIndicator.remove();
 }
 
+// === Streaming replies (/ask/stream sends Server-Sent Events; read via fetch so we can POST and abort) ===
+let activeStream = null; // { controller, id }
+
+function cancelActiveStream() {
+    if (!activeStream) return;
+    const stream = activeStream;
+    activeStream = null;
+    stream.controller.abort();
+    if (stream.id) {
+        // tell the server to stop too, in case the abort isn't noticed straight away
+        fetch(`/ask/stream/${stream.id}`, { method: 'DELETE' }).catch(() => {});
+    }
+}
+
+// One SSE block -> { event, data }; comment-only blocks (heartbeats) give null
+function parseSSE(block) {
+    let event = 'message';
+    const dataLines = [];
+    block.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+    });
+    if (!dataLines.length) return null;
+    return { event, data: JSON.parse(dataLines.join('\n')) };
+}
+
+async function streamReply(message) {
+    const stream = { controller: new AbortController(), id: null };
+    activeStream = stream;
+
+    const response = await fetch('/ask/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify({ message }),
+        signal: stream.controller.signal
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Streaming not available (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let bubble = null;
+
+    // show text as soon as the first chunk arrives
+    const render = (html) => {
+        if (!bubble) {
+            removeTypingIndicator();
+            bubble = addMessageToDOM('', false);
+        }
+        if (bubble) bubble.innerHTML = html;
+        if (chatMessages) chatMessages.scrollTop = chatMessages.scrollHeight;
+    };
+
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const msg = parseSSE(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!msg) continue;
+
+                if (msg.event === 'start') {
+                    stream.id = msg.data.id;
+                } else if (msg.event === 'chunk') {
+                    text += msg.data.text;
+                    render(text);
+                } else if (msg.event === 'error') {
+                    text = msg.data.error;
+                    render(text);
+                }
+            }
+        }
+    } catch (error) {
+        // hand the partly filled bubble to the caller so a fallback reply replaces it
+        error.bubble = bubble;
+        throw error;
+    }
+
+    if (activeStream === stream) activeStream = null;
+    return text;
+}
+
+// Replace a stream's partial bubble with the full reply, or add a new one if nothing was shown
+function showFallbackReply(text, bubble) {
+    if (bubble && bubble.isConnected) {
+        bubble.innerHTML = text;
+        saveMessages();
+    } else {
+        addMessage(text);
+    }
+}
+
 // === Send message ===
 async function sendMessage() {
     if (!userInput || !sendButton) {
@@ -254,6 +354,7 @@ async function sendMessage() {
     const message = userInput.value.trim();
     if (!message) return;
 
+    cancelActiveStream();
     addMessage(message, true);
     userInput.value = '';
     sendButton.disabled = true;
@@ -261,27 +362,39 @@ async function sendMessage() {
     showTypingIndicator();
 
     try {
-        const response = await fetch('/ask', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message })
-        });
-
-        const data = await response.json();
-
-        setTimeout(() => {
-            removeTypingIndicator();
-            addMessage(data.reply || 'Sorry, I encountered an error.');
-            if (sendButton) sendButton.disabled = false;
-        }, 800);
+        const text = await streamReply(message);
+        removeTypingIndicator();
+        if (!text) addMessageToDOM('Sorry, I encountered an error.');
+        saveMessages();
     } catch (error) {
-        console.error('Error sending message:', error);
         removeTypingIndicator();
-        addMessage('Sorry, I couldn\'t connect to the server. Please try again.');
+        if (error.name === 'AbortError') {
+            // cancelled (chat cleared / page left); keep whatever already arrived
+            saveMessages();
+            return;
+        }
+
+        // Fall back to the plain JSON endpoint
+        console.warn('Streaming failed, falling back to /ask:', error);
+        try {
+            const response = await fetch('/ask', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message })
+            });
+            const data = await response.json();
+            showFallbackReply(data.reply || 'Sorry, I encountered an error.', error.bubble);
+        } catch (fallbackError) {
+            console.error('Error sending message:', fallbackError);
+            showFallbackReply('Sorry, I couldn\'t connect to the server. Please try again.', error.bubble);
+        }
+    } finally {
         if (sendButton) sendButton.disabled = false;
     }
 }
 
+window.addEventListener('pagehide', cancelActiveStream);
+
 // Attach event listeners
 if (sendButton) {
     sendButton.addEventListener('click', (e) => {
@@ -306,6 +419,8 @@ if (clearChat) {
         e.preventDefault();
 
         if (confirm('Clear all chat messages?')) {
+            cancelActiveStream();
+
             // Clear from localStorage
             localStorage.removeItem('chatMessages');
 
@@ -104,55 +104,100 @@ function bindCourseButtons() {
   });
 }
 
-// Load courses dynamically
-async function loadCourses() {
-  try {
-    const res = await fetch('/courses/all');
-    const courses = await res.json();
-    const grid = document.querySelector('.courses-grid');
-    grid.innerHTML = '';
+// Load courses one keyset page at a time: the first page on load, later ones
+// when "Load more" is clicked. The cards render every field /courses/all
+// returns, so no field list is sent. Pages carry ETags, so unchanged pages are 304s.
+const COURSE_PAGE_SIZE = 50;
+let nextCourseCursor = null;
+let courseLoadId = 0;  // a newer loadCourses() call wins over a slower, older one
 
-    courses.forEach(course => {
-      const card = document.createElement('div');
-      card.className = 'course-card';
-      card.dataset.college = course.university_id;
-      card.dataset.degree = course.degree_type || '';
-      card.dataset.location = course.location || '';         // NEW
-      card.dataset.studyMode = course.study_mode || '';      // NEW
-
-      card.innerHTML = `
-        <div class="card-header">
-          <span class="college-badge badge-${course.college || 'unknown'}">
-            ${course.college || 'Unknown College'}
-          </span>
-          <div class="card-actions">
-            <button class="btn-icon btn-edit" data-id="${course.id}">✎</button>
-            <button class="btn-icon btn-delete" data-id="${course.id}">🗑</button>
-          </div>
+function renderCourseCards(grid, courses) {
+  courses.forEach(course => {
+    const card = document.createElement('div');
+    card.className = 'course-card';
+    card.dataset.college = course.university_id;
+    card.dataset.degree = course.degree_type || '';
+    card.dataset.location = course.location || '';         // NEW
+    card.dataset.studyMode = course.study_mode || '';      // NEW
+
+    card.innerHTML = `
+      <div class="card-header">
+        <span class="college-badge badge-${course.college || 'unknown'}">
+          ${course.college || 'Unknown College'}
+        </span>
+        <div class="card-actions">
+          <button class="btn-icon btn-edit" data-id="${course.id}">✎</button>
+          <button class="btn-icon btn-delete" data-id="${course.id}">🗑</button>
         </div>
-        <div class="card-body">
-          <h3 class="course-title">${course.title}</h3>
-          <p class="course-description">${course.description || 'No description available.'}</p>
-          <div class="course-meta">
-            <div class="meta-item"><strong>Duration:</strong> ${course.duration || 'N/A'} years</div>
-            <div class="meta-item meta-degree" data-degree="${course.degree_type || ''}">
-              <strong>Degree Type:</strong> ${course.degree_type || 'N/A'}
-            </div>
-            <div class="meta-item"><strong>Fees:</strong> ${course.fees || 'N/A'}</div>
-            <div class="meta-item"><strong>Location:</strong> ${course.location || 'N/A'}</div>        <!-- NEW -->
-            <div class="meta-item"><strong>Study Mode:</strong> ${course.study_mode || 'N/A'}</div>  <!-- NEW -->
+      </div>
+      <div class="card-body">
+        <h3 class="course-title">${course.title}</h3>
+        <p class="course-description">${course.description || 'No description available.'}</p>
+        <div class="course-meta">
+          <div class="meta-item"><strong>Duration:</strong> ${course.duration || 'N/A'} years</div>
+          <div class="meta-item meta-degree" data-degree="${course.degree_type || ''}">
+            <strong>Degree Type:</strong> ${course.degree_type || 'N/A'}
           </div>
+          <div class="meta-item"><strong>Fees:</strong> ${course.fees || 'N/A'}</div>
+          <div class="meta-item"><strong>Location:</strong> ${course.location || 'N/A'}</div>        <!-- NEW -->
+          <div class="meta-item"><strong>Study Mode:</strong> ${course.study_mode || 'N/A'}</div>  <!-- NEW -->
         </div>
-      `;
-      grid.appendChild(card);
-    });
+      </div>
+    `;
+    grid.appendChild(card);
+  });
+}
 
-    bindCourseButtons();
+function loadMoreButton(grid) {
+  let btn = document.getElementById('loadMoreCourses');
+  if (!btn) {
+    btn = document.createElement('button');
+    btn.id = 'loadMoreCourses';
+    btn.type = 'button';
+    btn.className = 'btn-secondary';
+    btn.textContent = 'Load more courses';
+    btn.addEventListener('click', loadMoreCourses);
+    grid.insertAdjacentElement('afterend', btn);
+  }
+  return btn;
+}
+
+async function loadCoursePage(grid, cursor, loadId) {
+  const params = new URLSearchParams({ limit: COURSE_PAGE_SIZE });
+  if (cursor) params.set('cursor', cursor);
+  const res = await fetch(`/courses/all?${params}`);
+  const page = await res.json();
+  if (!res.ok) throw new Error(page.error || 'Could not load courses');
+  if (loadId !== courseLoadId) return;  // superseded by a reload
+  renderCourseCards(grid, page.items || []);
+  nextCourseCursor = page.next_cursor;
+  loadMoreButton(grid).style.display = nextCourseCursor ? '' : 'none';
+  bindCourseButtons();
+}
+
+async function loadCourses() {
+  try {
+    const grid = document.querySelector('.courses-grid');
+    grid.innerHTML = '';
+    nextCourseCursor = null;
+    await loadCoursePage(grid, null, ++courseLoadId);
   } catch (err) {
     console.error('Error loading courses:', err);
   }
 }
 
+async function loadMoreCourses() {
+  if (!nextCourseCursor) return;
+  const btn = loadMoreButton(document.querySelector('.courses-grid'));
+  btn.disabled = true;
+  try {
+    await loadCoursePage(document.querySelector('.courses-grid'), nextCourseCursor, courseLoadId);
+  } catch (err) {
+    console.error('Error loading courses:', err);
+  } finally {
+    btn.disabled = false;
+  }
+}
 
 // Close Modal Events
 document.getElementById('modalClose').addEventListener('click', closeModal);
@@ -198,8 +243,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
 function bindCourseButtons() {
+  // Pages are appended, so only bind buttons that are new since the last call
   // Edit buttons
-  document.querySelectorAll('.btn-edit').forEach(btn => {
+  document.querySelectorAll('.btn-edit:not([data-bound])').forEach(btn => {
+    btn.dataset.bound = '1';
     btn.addEventListener('click', () => {
       const card = btn.closest('.course-card');
       courseIdInput.value = btn.dataset.id;
@@ -214,7 +261,8 @@ function bindCourseButtons() {
   });
 
   // Delete buttons
-  document.querySelectorAll('.btn-delete').forEach(btn => {
+  document.querySelectorAll('.btn-delete:not([data-bound])').forEach(btn => {
+    btn.dataset.bound = '1';
     btn.addEventListener('click', async () => {
       if (!confirm('Are you sure you want to delete this course?')) return;
       const id = btn.dataset.id;
@@ -247,6 +295,30 @@ pdfInput.addEventListener('change', () => {
   }
 });
 
+// Poll a background prospectus import until it finishes
+function pollImportJob(statusUrl) {
+  return new Promise((resolve, reject) => {
+    const timer = setInterval(async () => {
+      try {
+        const res = await fetch(statusUrl, { credentials: 'same-origin' });
+        const job = await res.json();
+        if (!res.ok || job.status === 'failed') {
+          clearInterval(timer);
+          reject(new Error(job.error || 'Import failed'));
+        } else if (job.status === 'done') {
+          clearInterval(timer);
+          resolve(job);
+        } else {
+          uploadPDFBtn.textContent = `Importing... ${job.progress || 0}%`;
+        }
+      } catch (err) {
+        clearInterval(timer);
+        reject(err);
+      }
+    }, 1000);
+  });
+}
+
 // Handle PDF upload
 uploadPDFBtn.addEventListener('click', async () => {
   const file = pdfInput.files[0];
@@ -260,23 +332,35 @@ uploadPDFBtn.addEventListener('click', async () => {
     return;
   }
 
-  const formData = new FormData();
-  formData.append('pdf', file);
-  formData.append('university_name', university);
+  // Send the file as the raw request body so the server can stream it to disk
+  const params = new URLSearchParams({ university_name: university, filename: file.name });
 
   try {
     uploadPDFBtn.textContent = 'Uploading...';
     uploadPDFBtn.disabled = true;
 
-    const res = await fetch('/ws/import-pdf', {
+    const res = await fetch(`/ws/import-pdf?${params}`, {
       method: 'POST',
-      body: formData
+      headers: { 'Content-Type': 'application/pdf' },
+      body: file
     });
 
     const data = await res.json();
     if (data.success) {
-      alert('✅ PDF imported successfully!');
-      loadCourses(); // reload course list
+      if (data.skipped) {
+        alert('ℹ️ ' + data.message);
+      } else {
+        uploadPDFBtn.textContent = 'Importing...';
+        let job;
+        try {
+          job = await pollImportJob(data.status_url);
+        } catch (err) {
+          alert('❌ Failed to import PDF: ' + err.message);
+          return;
+        }
+        alert('✅ ' + (job.message || 'PDF imported successfully!'));
+        loadCourses(); // reload course list
+      }
       fileNameDisplay.textContent = 'No file selected';
       pdfInput.value = ''; // reset file input
       document.getElementById('pdfUniversity').value = '';
@@ -153,6 +153,65 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Report download: start a background job, poll it, then download the
+    // saved PDF. Falls back to the plain link (synchronous render) on errors.
+    const downloadButton = document.querySelector('.download-button');
+    if (downloadButton) {
+        const originalLabel = downloadButton.innerHTML;
+
+        function pollReportJob(statusUrl) {
+            return new Promise((resolve, reject) => {
+                const timer = setInterval(async () => {
+                    try {
+                        const res = await fetch(statusUrl, { credentials: 'same-origin' });
+                        const job = await res.json();
+                        if (!res.ok || job.status === 'failed') {
+                            clearInterval(timer);
+                            reject(new Error(job.error || 'Report generation failed'));
+                        } else if (job.status === 'done') {
+                            clearInterval(timer);
+                            resolve(job);
+                        } else {
+                            downloadButton.textContent = `Generating report... ${job.progress || 0}%`;
+                        }
+                    } catch (err) {
+                        clearInterval(timer);
+                        reject(err);
+                    }
+                }, 1000);
+            });
+        }
+
+        downloadButton.addEventListener('click', async (e) => {
+            e.preventDefault();
+            if (downloadButton.classList.contains('busy')) return;
+            downloadButton.classList.add('busy');
+            downloadButton.textContent = 'Generating report...';
+            try {
+                const res = await fetch(downloadButton.href, {
+                    credentials: 'same-origin',
+                    headers: { 'Accept': 'application/json' }
+                });
+                const data = await res.json();
+                if (!res.ok) throw new Error(data.error || 'Could not start report');
+                if (data.cached && data.download_url) {
+                    // identical report already saved: no job to wait for
+                    window.location.href = data.download_url;
+                    return;
+                }
+                if (!data.status_url) throw new Error('Could not start report');
+                const job = await pollReportJob(data.status_url);
+                window.location.href = job.download_url;
+            } catch (err) {
+                console.error('Background report failed, falling back to direct download', err);
+                window.location.href = downloadButton.href;
+            } finally {
+                downloadButton.classList.remove('busy');
+                downloadButton.innerHTML = originalLabel;
+            }
+        });
+    }
+
     // Initialize
     updateNavigation();
 });
\ No newline at end of file
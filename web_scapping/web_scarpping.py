@@ -1,10 +1,16 @@
 # uct_pdf_scraper_clean.py
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 import pdfplumber
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import re
-import os
-import pandas as pd
+from routes.ws_export import export_table
 
 # ---------------------- Flask App & DB Setup ----------------------
 app = Flask(__name__)
@@ -144,22 +150,11 @@ def scrape_local_pdf_tables(pdf_path, university_id):
     db.session.commit()
     print(f"Scraped and saved {count} valid programs!")
 
-    # Export to CSV
-    programs_db = Program.query.all()
-    programs_list = [
-        {
-            "program_id": p.program_id,
-            "university_id": p.university_id,
-            "program_name": p.program_name,
-            "degree_type": p.degree_type,
-            "duration_years": p.duration_years,
-            "description": p.description
-        }
-        for p in programs_db
-    ]
-    df = pd.DataFrame(programs_list)
-    df.to_csv("programs_export.csv", index=False)
-    print("Programs exported to programs_export.csv")
+    # Export to CSV: streamed in chunks, appending only the programs added since the last export
+    export_table(db.engine,
+                 (Program.program_id, Program.university_id, Program.program_name,
+                  Program.degree_type, Program.duration_years, Program.description),
+                 Program.program_id, "programs_export.csv")
 
 # ---------------------- Main ----------------------
 if __name__ == "__main__":